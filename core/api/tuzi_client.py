@@ -8,13 +8,22 @@ Tuzi API 客户端
 import os
 import sys
 import json
-import requests
-from typing import List, Dict, Optional
+import time
+import random
+from typing import Iterator, List, Dict, Optional
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from core.config.config import config
+from core.prompts import build_image_prompt
+from core.utils.rate_limiter import CircuitBreaker
+
+# 可重试的 HTTP 状态码：限流和服务端临时错误
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+# 最多尝试次数（含首次请求），以及指数退避的最长等待秒数
+MAX_ATTEMPTS = 3
+MAX_BACKOFF = 8.0
 
 
 class TuziClient:
@@ -44,12 +53,39 @@ class TuziClient:
             'Content-Type': 'application/json'
         }
         
+        # 进程内所有 Tuzi 请求（ContentGenerator / 并发改写）共享同一个连接池，
+        # 复用 keep-alive 连接，避免每次请求都重新进行 TCP + TLS 握手
+        try:
+            import httpx
+            self.session = httpx.Client(
+                http2=True,
+                headers=self.headers,
+                timeout=60.0,
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8)
+            )
+            self._use_httpx = True
+        except ImportError:
+            # 未安装 httpx[http2] 时回退到 requests.Session
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            self.session = requests.Session()
+            self.session.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+            self._use_httpx = False
+        
+        # 上游连续失败时熔断：30 秒内直接返回失败，不再把线程耗在注定超时的请求上
+        self.breaker = CircuitBreaker(fail_max=5, reset_timeout=30)
+        
         print(f"🤖 Tuzi API 配置:")
         print(f"   API Base: {self.api_base}")
         print(f"   Model: {self.model}")
         print(f"   API Key: {self.api_key[:10]}...{self.api_key[-4:]}")
 
-    def chat_completion(self, messages: List[Dict], temperature: float = 0.7, max_tokens: int = 2000) -> Optional[str]:
+    def chat_completion(self, messages: List[Dict], temperature: float = 0.7, max_tokens: int = 2000,
+                        response_format: Optional[Dict] = None) -> Optional[str]:
         """
         调用 Tuzi Chat Completion API
         
@@ -57,36 +93,118 @@ class TuziClient:
             messages: 消息列表
             temperature: 温度参数
             max_tokens: 最大 token 数
+            response_format: 可选的输出格式，例如 {"type": "json_object"}
             
         Returns:
             GPT 的回答内容
         """
-        try:
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            }
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if response_format:
+            payload["response_format"] = response_format
+        
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                # 指数退避 + 随机抖动，避免并发请求同时重试
+                time.sleep(min(MAX_BACKOFF, 2 ** (attempt - 1)) + random.uniform(0, 1))
             
-            response = requests.post(
-                self.api_base,
-                headers=self.headers,
-                json=payload,
-                timeout=60
-            )
+            if not self.breaker.allow():
+                print("❌ Tuzi API 调用失败: 熔断中，暂停请求")
+                return None
+            
+            # 每条退出路径都要记录一次结果，否则熔断器放行的试探请求会让它一直停在半开状态
+            try:
+                response = self.session.post(self.api_base, json=payload, timeout=60)
+            except Exception as e:
+                print(f"❌ Tuzi API 调用异常: {e}")
+                self.breaker.record_failure()
+                continue
             
             if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content']
-            else:
-                print(f"❌ Tuzi API 调用失败: {response.status_code}")
-                print(f"   响应内容: {response.text}")
+                # 服务端已经正常响应：响应体无法解析时直接失败，不再重复发送请求
+                try:
+                    content = response.json()['choices'][0]['message']['content']
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    print(f"❌ Tuzi API 响应解析失败: {e}")
+                    self.breaker.record_failure()
+                    return None
+                self.breaker.record_success()
+                return content
+            
+            print(f"❌ Tuzi API 调用失败: {response.status_code}")
+            print(f"   响应内容: {response.text}")
+            if response.status_code not in RETRY_STATUS_CODES:
+                # 请求本身的错误（如 400/401），上游服务是可用的：按成功计入熔断器
+                self.breaker.record_success()
                 return None
+            self.breaker.record_failure()
+        
+        return None
+
+    def chat_completion_stream(self, messages: List[Dict], temperature: float = 0.7, max_tokens: int = 2000) -> Iterator[str]:
+        """
+        流式调用 Tuzi Chat Completion API，边生成边返回
+        
+        Args:
+            messages: 消息列表
+            temperature: 温度参数
+            max_tokens: 最大 token 数
+            
+        Yields:
+            逐段生成的内容片段；请求失败时不产生任何片段，连接中断时抛出异常
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        
+        if not self.breaker.allow():
+            print("❌ Tuzi API 调用失败: 熔断中，暂停请求")
+            return
+        
+        # 连接失败、读取中断或数据无法解析时计为失败再抛出，保证熔断器的试探请求总有结果
+        try:
+            if self._use_httpx:
+                stream = self.session.stream('POST', self.api_base, json=payload, timeout=60)
+            else:
+                stream = self.session.post(self.api_base, json=payload, timeout=60, stream=True)
+            
+            with stream as response:
+                if response.status_code != 200:
+                    if self._use_httpx:
+                        response.read()
+                    print(f"❌ Tuzi API 调用失败: {response.status_code}")
+                    print(f"   响应内容: {response.text}")
+                    if response.status_code in RETRY_STATUS_CODES:
+                        self.breaker.record_failure()
+                    else:
+                        # 请求本身的错误，上游服务是可用的
+                        self.breaker.record_success()
+                    return
+                self.breaker.record_success()
                 
-        except Exception as e:
-            print(f"❌ Tuzi API 调用异常: {e}")
-            return None
+                lines = response.iter_lines() if self._use_httpx else response.iter_lines(decode_unicode=True)
+                # SSE 格式：每行 "data: {...}"，以 "data: [DONE]" 结束
+                for line in lines:
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+                    choices = json.loads(data).get('choices') or [{}]
+                    delta = choices[0].get('delta', {}).get('content')
+                    if delta:
+                        yield delta
+        except Exception:
+            self.breaker.record_failure()
+            raise
 
     def simple_chat(self, question: str, system_prompt: Optional[str] = None) -> Optional[str]:
         """
@@ -156,9 +274,7 @@ class TuziClient:
             图片生成提示词
         """
         # 使用你提供的图片提示词模板
-        image_prompt = f"""Black background, large bold yellow Chinese text: '{main_title}'.
-Below that in smaller white font: '{subtitle}'.
-Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable for attention-grabbing social media thumbnail."""
+        image_prompt = build_image_prompt(main_title, subtitle)
         
         return image_prompt
 
@@ -1,5 +1,6 @@
 import os
 import sys
+from pathlib import Path
 
 # 尝试导入 dotenv，如果没有安装则提示
 try:
@@ -28,9 +29,16 @@ class Config:
         # 输入输出目录配置
         self.input_dir = os.getenv('INPUT_DIR', './input')
         self.output_dir = os.getenv('OUTPUT_DIR', './output')
+        # 默认选题文件路径只拼接一次，各处直接复用
+        self.default_topics_path = Path(self.input_dir) / "topics.txt"
+        
+        # 内容生成配置：每次请求合并生成的选题数量（默认 1 逐个流式生成，大于 1 时启用批量生成）
+        self.thread_batch_size = int(os.getenv('THREAD_BATCH_SIZE', '1'))
         
         # 发布模块配置（默认关闭）
         self.enable_publishing = os.getenv('ENABLE_PUBLISHING', 'false').lower() == 'true'
+        # 本地草稿格式：msgpack（需要安装 msgpack，未安装时使用 json）或 json
+        self.draft_format = os.getenv('DRAFT_FORMAT', 'msgpack').lower()
         
         # 图片生成配置
         self.enable_image_generation = os.getenv('ENABLE_IMAGE_GENERATION', 'true').lower() == 'true'
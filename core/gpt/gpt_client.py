@@ -7,6 +7,7 @@ GPT 客户端模块
 
 import os
 import sys
+import asyncio
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -19,6 +20,7 @@ except ImportError:
     print("⚠️ openai 库未安装，请运行: pip install openai")
 
 from core.config.config import config
+from core.utils.rate_limiter import CircuitBreaker
 
 
 class GPTClient:
@@ -39,6 +41,11 @@ class GPTClient:
             api_base = api_base.rstrip('/') + '/v1'
         self.api_base = api_base
         self.model = config.openai_model
+        # 被限流（HTTP 429）的累计次数，供调用方调整并发
+        self.rate_limit_hits = 0
+        # 上游连续失败时熔断，30 秒内直接返回失败，不再占用线程等待超时
+        # （新版本 SDK 自带指数退避重试，这里不再额外重试）
+        self.breaker = CircuitBreaker(fail_max=5, reset_timeout=30)
 
         # 检查 openai 版本并设置客户端
         try:
@@ -48,17 +55,42 @@ class GPTClient:
                 base_url=self.api_base
             )
             self.use_new_api = True
+            # 异步客户端按事件循环创建（见 _get_async_client）
+            self._aclient = None
+            self._aclient_loop = None
         except:
             # 使用旧版本 API (0.28.x)
             openai.api_key = self.api_key
             openai.api_base = self.api_base
             self.use_new_api = False
+            # 旧版本默认每个线程各自建立连接；指定共享的 Session，所有请求复用 keep-alive 连接池
+            openai.requestssession = self._build_requests_session()
 
         print(f"🤖 GPT API 配置:")
         print(f"   API Base: {self.api_base}")
         print(f"   Model: {self.model}")
         print(f"   API Key: {self.api_key[:10]}...{self.api_key[-4:] if self.api_key else 'None'}")
 
+    @staticmethod
+    def _build_requests_session():
+        """创建带连接池和重试策略的 requests.Session（旧版本 API 使用）"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        session = requests.Session()
+        # 只重试连接失败和幂等请求的 5xx：POST 重发会重复计费一次生成，
+        # 429 交给调用方处理，限流统计和熔断器才能看到
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[500, 502, 503, 504]
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry_strategy)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
     def chat_completion(self, messages, temperature=0.7, max_tokens=2000):
         """
         调用 GPT Chat Completion API
@@ -71,6 +103,10 @@ class GPTClient:
         Returns:
             GPT 的回答内容
         """
+        if not self.breaker.allow():
+            print("GPT API 调用失败: 熔断中，暂停请求")
+            return None
+        
         try:
             if self.use_new_api:
                 # 新版本 API (1.x)
@@ -80,7 +116,6 @@ class GPTClient:
                     temperature=temperature,
                     max_tokens=max_tokens
                 )
-                return response.choices[0].message.content
             else:
                 # 旧版本 API (0.28.x)
                 response = openai.ChatCompletion.create(
@@ -89,22 +124,179 @@ class GPTClient:
                     temperature=temperature,
                     max_tokens=max_tokens
                 )
-                return response.choices[0].message.content
+            content = response.choices[0].message.content
         except Exception as e:
+            self._record_error(e)
             print(f"GPT API 调用失败: {e}")
             return None
+        
+        self.breaker.record_success()
+        return content
 
-    def simple_chat(self, question, system_prompt=None):
+    def _record_error(self, error: Exception):
+        """记录失败的请求（计入熔断），其中被限流的请求单独计数（新版本异常带 status_code，旧版本为 RateLimitError）"""
+        self.breaker.record_failure()
+        if getattr(error, 'status_code', None) == 429 or type(error).__name__ == 'RateLimitError':
+            self.rate_limit_hits += 1
+
+    def _get_async_client(self):
         """
-        简单的对话接口
+        获取当前事件循环的异步客户端（新版本 API）
         
-        Args:
-            question: 用户问题
-            system_prompt: 系统提示词（可选）
+        异步客户端的连接池绑定在创建它的事件循环上，
+        每次 asyncio.run 都是新的事件循环，需要重新创建
+        """
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            self._aclient = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.api_base
+            )
+            self._aclient_loop = loop
+        return self._aclient
+
+    async def achat_completion(self, messages, temperature=0.7, max_tokens=2000):
+        """
+        异步调用 GPT Chat Completion API，参数和返回值同 chat_completion
         
-        Returns:
-            GPT 的回答
+        多个请求可以在同一个事件循环里并发等待，不需要为每个请求占用一个线程
         """
+        if not self.breaker.allow():
+            print("GPT API 调用失败: 熔断中，暂停请求")
+            return None
+        
+        try:
+            if self.use_new_api:
+                # 新版本 API (1.x)
+                response = await self._get_async_client().chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            else:
+                # 旧版本 API (0.28.x)
+                response = await openai.ChatCompletion.acreate(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            content = response.choices[0].message.content
+        except Exception as e:
+            self._record_error(e)
+            print(f"GPT API 调用失败: {e}")
+            return None
+        
+        self.breaker.record_success()
+        return content
+
+    @staticmethod
+    def _chunk_delta(chunk):
+        """取出流式响应片段中的增量内容（新版本为对象，旧版本为字典）"""
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+        return delta.get('content') if isinstance(delta, dict) else delta.content
+
+    def stream_chat_completion(self, messages, temperature=0.7, max_tokens=2000):
+        """
+        流式调用 GPT Chat Completion API，参数同 chat_completion
+        
+        首个 token 到达后即可开始处理；调用方拿到需要的内容后可以提前停止迭代（close），
+        连接随之关闭，剩余的 token 不再接收
+        
+        Yields:
+            回答内容的增量片段；熔断中或请求失败时提前结束
+        """
+        if not self.breaker.allow():
+            print("GPT API 调用失败: 熔断中，暂停请求")
+            return
+        
+        stream = None
+        try:
+            if self.use_new_api:
+                # 新版本 API (1.x)
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+                )
+            else:
+                # 旧版本 API (0.28.x)
+                stream = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+                )
+            for chunk in stream:
+                delta = self._chunk_delta(chunk)
+                if delta:
+                    yield delta
+        except GeneratorExit:
+            # 调用方提前停止：请求本身是成功的，关闭连接
+            self.breaker.record_success()
+            if hasattr(stream, 'close'):
+                stream.close()
+            raise
+        except Exception as e:
+            self._record_error(e)
+            print(f"GPT API 调用失败: {e}")
+            return
+        
+        self.breaker.record_success()
+
+    async def astream_chat_completion(self, messages, temperature=0.7, max_tokens=2000):
+        """流式调用 GPT Chat Completion API 的异步版本，参数和产出同 stream_chat_completion"""
+        if not self.breaker.allow():
+            print("GPT API 调用失败: 熔断中，暂停请求")
+            return
+        
+        stream = None
+        try:
+            if self.use_new_api:
+                # 新版本 API (1.x)
+                stream = await self._get_async_client().chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+                )
+            else:
+                # 旧版本 API (0.28.x)
+                stream = await openai.ChatCompletion.acreate(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+                )
+            async for chunk in stream:
+                delta = self._chunk_delta(chunk)
+                if delta:
+                    yield delta
+        except GeneratorExit:
+            # 调用方提前停止：请求本身是成功的，关闭连接（新版本为 close，旧版本为异步生成器的 aclose）
+            self.breaker.record_success()
+            if hasattr(stream, 'close'):
+                await stream.close()
+            elif hasattr(stream, 'aclose'):
+                await stream.aclose()
+            raise
+        except Exception as e:
+            self._record_error(e)
+            print(f"GPT API 调用失败: {e}")
+            return
+        
+        self.breaker.record_success()
+
+    def _build_messages(self, question, system_prompt=None):
+        """构建对话消息列表"""
         messages = []
         
         if system_prompt:
@@ -112,7 +304,24 @@ class GPTClient:
         
         messages.append({"role": "user", "content": question})
         
-        return self.chat_completion(messages)
+        return messages
+
+    def simple_chat(self, question, system_prompt=None):
+        """
+        简单的对话接口
+        
+        Args:
+            question: 用户问题
+            system_prompt: 系统提示词（可选）
+        
+        Returns:
+            GPT 的回答
+        """
+        return self.chat_completion(self._build_messages(question, system_prompt))
+
+    async def asimple_chat(self, question, system_prompt=None):
+        """简单对话接口的异步版本，参数和返回值同 simple_chat"""
+        return await self.achat_completion(self._build_messages(question, system_prompt))
 
     def rewrite_with_style_guide(self, content, style_guide_file="input/style_guide.md", task_instruction="请改写以下内容"):
         """
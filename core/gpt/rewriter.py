@@ -11,6 +11,7 @@ import time
 import random
 from typing import List, Dict, Optional
 from .gpt_client import gpt_client
+from ..utils.json_io import dump_file
 
 
 class GPTRewriter:
@@ -170,6 +171,72 @@ Please begin rewriting:"""
             "has_level_placeholder": '{level}' in self.thread_prompt
         }
 
+    # 英文改写使用的系统提示词（风格指南）
+    ENGLISH_STYLE_GUIDE = "You are a professional English content creator. Create engaging, natural English social media content suitable for international audiences."
+
+    def _build_prompt(self, english: bool, title: str, description: str, tags: str = "", summary: str = "", conclusion: str = "", level: int = 3) -> str:
+        """根据笔记字段构建中文或英文改写提示词"""
+        template = self._get_english_thread_prompt() if english else self.thread_prompt
+        return template.format(
+            title=title,
+            description=description,
+            tags=tags,
+            summary=summary,
+            conclusion=conclusion,
+            level=level
+        )
+
+    def _parse_thread_response(self, response: Optional[str], english: bool = False) -> Optional[List[Dict[str, str]]]:
+        """
+        从 GPT 响应中解析 Thread
+        
+        Args:
+            response: GPT 返回的原始文本
+            english: 是否为英文改写（只影响日志文字）
+            
+        Returns:
+            Thread 列表，解析失败时返回 None
+        """
+        lang = "英文" if english else ""
+        
+        if not response:
+            print(f"❌ {lang}GPT 改写失败: 没有返回内容")
+            return None
+
+        print(f"🔍 {lang}GPT 原始响应: {response[:500]}...")  # 调试信息
+        
+        # 尝试解析 JSON
+        try:
+            # 提取 JSON 部分
+            json_start = response.find('[')
+            json_end = response.rfind(']') + 1
+            
+            if json_start == -1 or json_end == 0:
+                print(f"❌ {lang}GPT 返回格式错误: 找不到 JSON 数组")
+                return None
+            
+            json_str = response[json_start:json_end]
+            thread = json.loads(json_str)
+            
+            # 验证格式
+            if not isinstance(thread, list) or len(thread) == 0:
+                print(f"❌ {lang}GPT 返回格式错误: 不是有效的数组")
+                return None
+            
+            # 确保每个元素都有 tweet 字段
+            for i, tweet_obj in enumerate(thread):
+                if not isinstance(tweet_obj, dict) or 'tweet' not in tweet_obj:
+                    print(f"❌ {lang}第 {i+1} 条推文格式错误")
+                    return None
+            
+            print(f"✅ 成功改写为 {len(thread)} 条{lang}推文的 Thread")
+            return thread
+            
+        except json.JSONDecodeError as e:
+            print(f"❌ {lang}JSON 解析失败: {str(e)}")
+            print(f"原始响应: {response[:200]}...")
+            return None
+
     def rewrite_note_to_thread(self, title: str, description: str, tags: str = "", summary: str = "", conclusion: str = "", level: int = 3) -> Optional[List[Dict[str, str]]]:
         """
         将单个笔记改写为 Twitter Thread
@@ -187,55 +254,11 @@ Please begin rewriting:"""
         """
         try:
             # 构建用户提示词
-            user_prompt = self.thread_prompt.format(
-                title=title,
-                description=description,
-                tags=tags,
-                summary=summary,
-                conclusion=conclusion,
-                level=level
-            )
+            user_prompt = self._build_prompt(False, title, description, tags, summary, conclusion, level)
             
             # 直接使用用户提示词，thread_prompt已包含所需的指导信息
             response = gpt_client.simple_chat(user_prompt)
-
-            if not response:
-                print(f"❌ GPT 改写失败: 没有返回内容")
-                return None
-
-            print(f"🔍 GPT 原始响应: {response[:500]}...")  # 调试信息
-            
-            # 尝试解析 JSON
-            try:
-                # 提取 JSON 部分
-                json_start = response.find('[')
-                json_end = response.rfind(']') + 1
-                
-                if json_start == -1 or json_end == 0:
-                    print(f"❌ GPT 返回格式错误: 找不到 JSON 数组")
-                    return None
-                
-                json_str = response[json_start:json_end]
-                thread = json.loads(json_str)
-                
-                # 验证格式
-                if not isinstance(thread, list) or len(thread) == 0:
-                    print(f"❌ GPT 返回格式错误: 不是有效的数组")
-                    return None
-                
-                # 确保每个元素都有 tweet 字段
-                for i, tweet_obj in enumerate(thread):
-                    if not isinstance(tweet_obj, dict) or 'tweet' not in tweet_obj:
-                        print(f"❌ 第 {i+1} 条推文格式错误")
-                        return None
-                
-                print(f"✅ 成功改写为 {len(thread)} 条推文的 Thread")
-                return thread
-                
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON 解析失败: {str(e)}")
-                print(f"原始响应: {response[:200]}...")
-                return None
+            return self._parse_thread_response(response)
                 
         except Exception as e:
             print(f"❌ 改写过程中出错: {str(e)}")
@@ -259,60 +282,36 @@ Please begin rewriting:"""
             英文Thread 列表，每个元素包含一条推文
         """
         try:
-            # 构建英文提示词
-            english_prompt = self._get_english_thread_prompt().format(
-                title=title,
-                description=description,
-                tags=tags,
-                summary=summary,
-                conclusion=conclusion,
-                level=level
-            )
-            
-            # 使用英文风格指南
-            english_style_guide = "You are a professional English content creator. Create engaging, natural English social media content suitable for international audiences."
-            response = gpt_client.simple_chat(english_prompt, english_style_guide)
-
-            if not response:
-                print(f"❌ 英文GPT 改写失败: 没有返回内容")
-                return None
+            # 构建英文提示词，使用英文风格指南
+            english_prompt = self._build_prompt(True, title, description, tags, summary, conclusion, level)
+            response = gpt_client.simple_chat(english_prompt, self.ENGLISH_STYLE_GUIDE)
+            return self._parse_thread_response(response, english=True)
+                
+        except Exception as e:
+            print(f"❌ 英文改写过程中出错: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
 
-            print(f"🔍 英文GPT 原始响应: {response[:500]}...")  # 调试信息
+    async def arewrite_note(self, english: bool, title: str, description: str, tags: str = "", summary: str = "", conclusion: str = "", level: int = 3) -> Optional[List[Dict[str, str]]]:
+        """
+        rewrite_note_to_thread / rewrite_note_to_english_thread 的异步版本
+        
+        Args:
+            english: 是否改写为英文 Thread
+            其余参数同 rewrite_note_to_thread
             
-            # 尝试解析 JSON
-            try:
-                # 提取 JSON 部分
-                json_start = response.find('[')
-                json_end = response.rfind(']') + 1
-                
-                if json_start == -1 or json_end == 0:
-                    print(f"❌ 英文GPT 返回格式错误: 找不到 JSON 数组")
-                    return None
-                
-                json_str = response[json_start:json_end]
-                thread = json.loads(json_str)
-                
-                # 验证格式
-                if not isinstance(thread, list) or len(thread) == 0:
-                    print(f"❌ 英文GPT 返回格式错误: 不是有效的数组")
-                    return None
-                
-                # 确保每个元素都有 tweet 字段
-                for i, tweet_obj in enumerate(thread):
-                    if not isinstance(tweet_obj, dict) or 'tweet' not in tweet_obj:
-                        print(f"❌ 英文第 {i+1} 条推文格式错误")
-                        return None
-                
-                print(f"✅ 成功改写为 {len(thread)} 条英文推文的 Thread")
-                return thread
-                
-            except json.JSONDecodeError as e:
-                print(f"❌ 英文JSON 解析失败: {str(e)}")
-                print(f"原始响应: {response[:200]}...")
-                return None
+        Returns:
+            Thread 列表，每个元素包含一条推文
+        """
+        lang = "英文" if english else ""
+        try:
+            prompt = self._build_prompt(english, title, description, tags, summary, conclusion, level)
+            response = await gpt_client.asimple_chat(prompt, self.ENGLISH_STYLE_GUIDE if english else None)
+            return self._parse_thread_response(response, english=english)
                 
         except Exception as e:
-            print(f"❌ 英文改写过程中出错: {str(e)}")
+            print(f"❌ {lang}改写过程中出错: {str(e)}")
             import traceback
             traceback.print_exc()
             return None
@@ -347,8 +346,7 @@ Please begin rewriting:"""
             # 确保输出目录存在
             os.makedirs(os.path.dirname(filename), exist_ok=True)
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(thread, f, ensure_ascii=False, indent=2)
+            dump_file(thread, filename)
             print(f"💾 Thread 已保存到 {filename}")
             return filename
         except Exception as e:
@@ -20,6 +20,9 @@ class ThreadBasedImageGenerator:
         self.prompt_generator = prompt_generator
         self.image_creator = image_creator
         
+        # 可用性检查结果缓存 (available, reason)，进程内只检查一次
+        self._avail_cache: Optional[Tuple[bool, str]] = None
+        
         # 初始化改写器
         try:
             self.rewriter = GPTRewriter()
@@ -261,22 +264,39 @@ class ThreadBasedImageGenerator:
         
         return thread_content, image_prompt
     
-    def _check_availability(self) -> bool:
-        """检查系统可用性"""
-        rewriter_available = self.rewriter is not None
-        prompt_available = self.prompt_generator is not None
-        image_available = self.image_creator.is_available()
+    def _do_check_availability(self) -> Tuple[bool, str]:
+        """实际执行可用性检查，返回 (是否可用, 不可用原因)"""
+        reasons = []
         
-        if not rewriter_available:
-            print("❌ Thread改写器不可用")
+        if self.rewriter is None:
+            reasons.append("Thread改写器不可用")
         
-        if not prompt_available:
-            print("❌ 提示词生成器不可用")
+        if self.prompt_generator is None:
+            reasons.append("提示词生成器不可用")
         
-        if not image_available:
-            print("❌ 图片创建器不可用")
+        if not self.image_creator.is_available():
+            reasons.append("图片创建器不可用")
         
-        return rewriter_available and prompt_available and image_available
+        return not reasons, "; ".join(reasons)
+    
+    def _check_availability(self) -> bool:
+        """
+        检查系统可用性
+        
+        结果在进程内缓存，只在首次调用时检查一次；
+        如需重新检查请先调用 invalidate_availability()
+        """
+        if self._avail_cache is None:
+            self._avail_cache = self._do_check_availability()
+        
+        available, reason = self._avail_cache
+        if not available:
+            print(f"❌ {reason}")
+        return available
+    
+    def invalidate_availability(self):
+        """清除可用性检查缓存，下次检查时重新探测"""
+        self._avail_cache = None
     
     def is_available(self) -> bool:
         """检查系统是否可用"""
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共用提示词
+封面图提示词在内容生成、图片生成和 Thread 生成器中格式完全相同，统一在这里构建
+"""
+
+import functools
+
+# 封面图提示词模板：黑底黄字主标题 + 白色副标题
+IMAGE_PROMPT_TEMPLATE = """Black background, large bold yellow Chinese text: '{title}'.
+Below that in smaller white font: '{subtitle}'.
+Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable for attention-grabbing social media thumbnail."""
+
+# 模板在两个变量处拆成三段，构建时直接拼接，不再每次解析格式字符串
+_IMAGE_PROMPT_HEAD, _rest = IMAGE_PROMPT_TEMPLATE.split('{title}')
+_IMAGE_PROMPT_MIDDLE, _IMAGE_PROMPT_TAIL = _rest.split('{subtitle}')
+del _rest
+
+
+@functools.lru_cache(maxsize=128)
+def build_image_prompt(title: str, subtitle: str) -> str:
+    """
+    构建封面图提示词（同一组标题只构建一次）
+
+    Args:
+        title: 主标题
+        subtitle: 副标题
+
+    Returns:
+        图片生成提示词
+    """
+    return _IMAGE_PROMPT_HEAD + title + _IMAGE_PROMPT_MIDDLE + subtitle + _IMAGE_PROMPT_TAIL
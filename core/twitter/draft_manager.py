@@ -9,26 +9,38 @@ import os
 import sys
 import json
 import time
+import hashlib
+from datetime import datetime
 from typing import List, Dict, Optional
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
+# tweepy 依赖较重，延迟到创建 TwitterDraftManager 时再导入
+
 try:
-    import tweepy
-    TWEEPY_AVAILABLE = True
+    import xxhash
+    XXHASH_AVAILABLE = True
 except ImportError:
-    TWEEPY_AVAILABLE = False
-    print("⚠️ tweepy 库未安装，请运行: pip install tweepy")
+    XXHASH_AVAILABLE = False
 
 from core.config.config import config
 
 
+def _content_hash(payload: bytes) -> str:
+    """计算草稿内容的短哈希（8位十六进制），用于区分同一秒内保存的草稿"""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_64(payload).hexdigest()[:8]
+    return hashlib.blake2b(payload, digest_size=4).hexdigest()
+
+
 class TwitterDraftManager:
     """Twitter 草稿管理器"""
 
     def __init__(self):
-        if not TWEEPY_AVAILABLE:
+        try:
+            import tweepy
+        except ImportError:
             raise ImportError("Tweepy 库未安装，请先安装: pip install tweepy")
 
         if config is None:
@@ -110,7 +122,6 @@ class TwitterDraftManager:
     def _save_local_draft(self, draft_data: Dict) -> Optional[str]:
         """保存草稿到本地文件"""
         try:
-            from datetime import datetime
             now = datetime.now()
             date_folder = now.strftime("%Y-%m-%d")
             timestamp = now.strftime("%H%M%S")
@@ -119,10 +130,13 @@ class TwitterDraftManager:
             draft_dir = f"output/drafts/{date_folder}"
             os.makedirs(draft_dir, exist_ok=True)
             
-            filename = f"{draft_dir}/twitter_draft_{timestamp}.json"
+            # 序列化一次，同时用于内容哈希和写入文件
+            payload = json.dumps(draft_data, ensure_ascii=False, indent=2).encode('utf-8')
+            short_hash = _content_hash(payload)
+            filename = f"{draft_dir}/twitter_draft_{timestamp}_{short_hash}.json"
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(draft_data, f, ensure_ascii=False, indent=2)
+            with open(filename, 'wb') as f:
+                f.write(payload)
             
             return filename
         except Exception as e:
@@ -6,30 +6,69 @@ Twitter 直接发布模块
 """
 
 import os
-import sys
 import json
 import time
-from typing import List, Dict, Optional
+import asyncio
+import functools
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict
 
-# 添加项目根目录到路径
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+# tweepy 依赖较重，延迟到创建 TwitterPublisher 时再导入
+from ..config.config import config
+from ..utils.rate_limiter import AdaptiveSemaphore
+from ..utils.thread_file import load_thread_file, JSON_ERRORS
 
-try:
-    import tweepy
-    TWEEPY_AVAILABLE = True
-except ImportError:
-    TWEEPY_AVAILABLE = False
-    print("⚠️ tweepy 库未安装，请运行: pip install tweepy")
+# 发推端点，用作限流配额的键
+TWEETS_ENDPOINT = "/2/tweets"
 
-from core.config.config import config
+# get_me() 用户名缓存有效期（秒）
+ME_CACHE_TTL = 3600
+
+
+def _preview(text: str, limit: int = 100) -> str:
+    """截取推文内容用于日志预览"""
+    return f"{text[:limit]}{'...' if len(text) > limit else ''}"
+
+
+@functools.lru_cache(maxsize=32)
+def _ensure_dir(path: str) -> str:
+    """创建目录并返回路径，同一进程内每个路径只调用一次 os.makedirs"""
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _dump_publish_record(filename: str, fields: Dict, tweets: List[Dict]):
+    """
+    流式写入发布记录 JSON：先写普通字段，再逐条写入 tweets 数组，
+    不需要先拼出包含全部推文的完整字典
+    """
+    with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write('{\n')
+        for key, value in fields.items():
+            f.write(f'  {json.dumps(key, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)},\n')
+        f.write('  "tweets": [')
+        for i, tweet in enumerate(tweets):
+            f.write(',\n    ' if i else '\n    ')
+            json.dump(tweet, f, ensure_ascii=False)
+        f.write('\n  ]\n}\n' if tweets else ']\n}\n')
 
 
 class TwitterPublisher:
     """Twitter 直接发布器"""
 
     def __init__(self):
-        if not TWEEPY_AVAILABLE:
+        try:
+            import tweepy
+        except ImportError:
             raise ImportError("Tweepy 库未安装，请先安装: pip install tweepy")
+        self._tweepy = tweepy
+        
+        try:
+            from tweepy.asynchronous import AsyncClient
+        except ImportError:
+            # 需要 pip install "tweepy[async]"，未安装时异步发布回退到线程中调用同步客户端
+            AsyncClient = None
 
         if config is None:
             raise ValueError("配置未正确加载，请检查 .env 文件")
@@ -41,6 +80,12 @@ class TwitterPublisher:
         self.access_token_secret = config.twitter_access_token_secret
         self.bearer_token = config.twitter_bearer_token
 
+        # 按端点记录 Twitter 返回的限流配额，发推前主动等待
+        self._rate_limits = defaultdict(lambda: AdaptiveSemaphore(default=5))
+        
+        # get_me() 结果缓存 (用户名, 获取时间)
+        self._me_cache = (None, 0.0)
+
         # 初始化 Twitter API 客户端
         try:
             # 使用 API v2
@@ -52,11 +97,28 @@ class TwitterPublisher:
                 access_token_secret=self.access_token_secret,
                 wait_on_rate_limit=True
             )
+            # tweepy 的响应对象不带响应头，通过 session 钩子读取限流信息
+            self.client.session.hooks['response'].append(self._record_rate_limit)
+            
+            # 异步客户端（可选），用于 publish_thread_async
+            self.aclient = None
+            if AsyncClient is not None:
+                self.aclient = AsyncClient(
+                    bearer_token=self.bearer_token,
+                    consumer_key=self.api_key,
+                    consumer_secret=self.api_secret,
+                    access_token=self.access_token,
+                    access_token_secret=self.access_token_secret,
+                    wait_on_rate_limit=True
+                )
+                # 异步客户端走 aiohttp，不经过上面的 session 钩子，包装 request() 读取限流响应头
+                self.aclient.request = self._wrap_async_request(self.aclient.request)
             
             # 验证认证
             try:
-                me = self.client.get_me()
-                self.username = me.data.username
+                self.username = self._me(force=True)
+                # 推文链接前缀只拼接一次，之后每条推文直接追加 ID
+                self._url_prefix = f"https://twitter.com/{self.username}/status/"
                 self.is_available = True
                 print(f"✅ Twitter Publisher 初始化成功: @{self.username}")
             except Exception as e:
@@ -66,11 +128,81 @@ class TwitterPublisher:
         except Exception as e:
             print(f"❌ Twitter Publisher 初始化失败: {e}")
             self.client = None
+            self.aclient = None
             self.is_available = False
 
+    def _me(self, force: bool = False) -> str:
+        """
+        获取当前认证用户名，结果缓存 ME_CACHE_TTL 秒
+        
+        Args:
+            force: 是否忽略缓存，强制请求 get_me()
+        """
+        username, fetched_at = self._me_cache
+        if not force and username and time.time() - fetched_at < ME_CACHE_TTL:
+            return username
+        
+        me = self.client.get_me()
+        self._me_cache = (me.data.username, time.time())
+        return me.data.username
+
     def publish_thread(self, thread: List[Dict[str, str]], title: str = "", delay_seconds: int = 2) -> bool:
         """
-        直接发布 Thread 到 Twitter
+        直接发布 Thread 到 Twitter（同步接口，内部运行 publish_thread_async）
+        
+        注意：不能在已运行的事件循环中调用，异步代码请直接 await publish_thread_async()
+        
+        Args:
+            thread: Thread 内容列表，格式: [{"tweet": "内容"}, ...]
+            title: Thread 标题（仅用于日志显示）
+            delay_seconds: 推文之间的延迟时间（秒）
+            
+        Returns:
+            是否发布成功
+        """
+        return asyncio.run(self.publish_thread_async(thread, title, delay_seconds))
+
+    def _update_rate_limit(self, endpoint: str, headers):
+        """记录 x-rate-limit-* 响应头中的剩余配额"""
+        self._rate_limits[endpoint].update_from_headers(
+            headers,
+            remaining_key='x-rate-limit-remaining',
+            reset_key='x-rate-limit-reset'
+        )
+
+    def _record_rate_limit(self, response, *args, **kwargs):
+        """requests 响应钩子：记录同步客户端响应中的限流配额"""
+        self._update_rate_limit(response.request.path_url.split('?', 1)[0], response.headers)
+        return response
+
+    def _wrap_async_request(self, request):
+        """包装 AsyncClient.request，记录 aiohttp 响应中的限流配额"""
+        @functools.wraps(request)
+        async def wrapped(method, route, *args, **kwargs):
+            response = await request(method, route, *args, **kwargs)
+            self._update_rate_limit(route.split('?', 1)[0], response.headers)
+            return response
+        return wrapped
+
+    async def _create_tweet_async(self, text: str, in_reply_to_tweet_id=None):
+        """异步发布单条推文，没有异步客户端时在线程中调用同步客户端"""
+        kwargs = {'text': text}
+        if in_reply_to_tweet_id is not None:
+            kwargs['in_reply_to_tweet_id'] = in_reply_to_tweet_id
+        
+        # 配额用完时等待到重置时间（在线程中等待，不阻塞事件循环）
+        await asyncio.to_thread(self._rate_limits[TWEETS_ENDPOINT].acquire)
+        
+        if self.aclient:
+            return await self.aclient.create_tweet(**kwargs)
+        return await asyncio.to_thread(self.client.create_tweet, **kwargs)
+
+    async def publish_thread_async(self, thread: List[Dict[str, str]], title: str = "", delay_seconds: int = 2) -> bool:
+        """
+        异步发布 Thread 到 Twitter
+        
+        推文之间保持回复链顺序（第 i+1 条等待第 i 条完成），
+        等待期间不阻塞事件循环，可与其他 Thread 的发布并发执行
         
         Args:
             thread: Thread 内容列表，格式: [{"tweet": "内容"}, ...]
@@ -88,20 +220,21 @@ class TwitterPublisher:
             print("❌ Thread 内容为空")
             return False
 
-        print(f"🚀 开始直接发布 Thread 到 Twitter")
+        # 标题、数量和预览拼成一条输出，每次 print 都会经过 DualOutput 写控制台和日志
+        lines = ["🚀 开始直接发布 Thread 到 Twitter"]
         if title:
-            print(f"📝 Thread 标题: {title}")
-        print(f"📊 包含 {len(thread)} 条推文")
-
-        # 预览推文内容
-        print(f"\n📱 Thread 预览:")
+            lines.append(f"📝 Thread 标题: {title}")
+        lines.append(f"📊 包含 {len(thread)} 条推文")
+        lines.append("\n📱 Thread 预览:")
         for i, tweet_obj in enumerate(thread, 1):
-            tweet_text = tweet_obj.get('tweet', '')
-            print(f"{i}/{len(thread)}: {tweet_text[:100]}{'...' if len(tweet_text) > 100 else ''}")
+            lines.append(f"{i}/{len(thread)}: {_preview(tweet_obj.get('tweet', ''))}")
+        print('\n'.join(lines))
 
         try:
-            tweet_ids = []
-            published_tweets = []
+            # 按位置预分配结果列表，跳过的空推文保留为 None，结束时统一过滤
+            n = len(thread)
+            published_tweets = [None] * n
+            prev_id = None
             
             for i, tweet_obj in enumerate(thread):
                 tweet_text = tweet_obj.get('tweet', '')
@@ -110,51 +243,50 @@ class TwitterPublisher:
                     print(f"⚠️ 第 {i+1} 条推文内容为空，跳过")
                     continue
 
-                print(f"\n📤 发布第 {i+1}/{len(thread)} 条推文...")
-                print(f"内容: {tweet_text}")
-                
                 try:
-                    if i == 0:
-                        # 第一条推文
-                        response = self.client.create_tweet(text=tweet_text)
-                    else:
-                        # 回复前一条推文，形成线程
-                        response = self.client.create_tweet(
-                            text=tweet_text,
-                            in_reply_to_tweet_id=tweet_ids[-1]
-                        )
+                    # 第一条推文直接发布，之后的推文回复前一条，形成线程
+                    response = await self._create_tweet_async(tweet_text, in_reply_to_tweet_id=prev_id)
                     
-                    tweet_id = response.data['id']
-                    tweet_ids.append(tweet_id)
-                    published_tweets.append({
+                    tweet_id = prev_id = response.data['id']
+                    published_tweets[i] = {
                         'tweet_id': tweet_id,
                         'content': tweet_text,
                         'position': i + 1
-                    })
+                    }
                     
-                    tweet_url = f"https://twitter.com/{self.username}/status/{tweet_id}"
-                    print(f"✅ 第 {i+1} 条推文发布成功")
-                    print(f"🔗 链接: {tweet_url}")
+                    # 每条推文只输出一条记录：位置、链接、内容预览和等待时间
+                    record = (f"\n✅ 第 {i+1}/{n} 条推文发布成功: {_preview(tweet_text)}"
+                              f"\n🔗 链接: {self._url_prefix}{tweet_id}")
                     
-                    # 延迟避免限制
-                    if i < len(thread) - 1:
-                        print(f"⏳ 等待 {delay_seconds} 秒...")
-                        time.sleep(delay_seconds)
+                    # 根据限流响应头调整间隔：配额充足时少等，没有限流信息时按 delay_seconds 等待
+                    wait_seconds = 0
+                    if i < n - 1:
+                        pacing = self._rate_limits[TWEETS_ENDPOINT].pacing_delay()
+                        wait_seconds = delay_seconds if pacing is None else min(delay_seconds, pacing)
+                        if wait_seconds > 0:
+                            record += f"\n⏳ 等待 {wait_seconds:.1f} 秒..."
+                    print(record)
+                    
+                    if wait_seconds > 0:
+                        await asyncio.sleep(wait_seconds)
                         
                 except Exception as e:
-                    print(f"❌ 第 {i+1} 条推文发布失败: {e}")
+                    print(f"❌ 第 {i+1}/{n} 条推文发布失败: {e}\n内容: {tweet_text}")
                     # 如果发布失败，返回已发布的推文信息
-                    if tweet_ids:
-                        print(f"⚠️ 已发布 {len(tweet_ids)} 条推文，后续发布中断")
-                        self._save_partial_result(published_tweets, title)
+                    if prev_id is not None:
+                        published_tweets = [t for t in published_tweets if t is not None]
+                        print(f"⚠️ 已发布 {len(published_tweets)} 条推文，后续发布中断")
+                        self._save_result(published_tweets, title, status="partial")
                     return False
 
-            print(f"\n🎉 Thread 发布完成！")
-            print(f"✅ 成功发布 {len(tweet_ids)} 条推文")
-            print(f"🔗 Thread 链接: https://twitter.com/{self.username}/status/{tweet_ids[0]}")
+            published_tweets = [t for t in published_tweets if t is not None]
+            
+            print(f"\n🎉 Thread 发布完成！"
+                  f"\n✅ 成功发布 {len(published_tweets)} 条推文"
+                  f"\n🔗 Thread 链接: {self._url_prefix}{published_tweets[0]['tweet_id']}")
             
             # 保存发布记录
-            self._save_publish_result(published_tweets, title)
+            self._save_result(published_tweets, title)
             
             return True
 
@@ -178,97 +310,66 @@ class TwitterPublisher:
             return False
 
         try:
-            with open(thread_file, 'r', encoding='utf-8') as f:
-                thread_data = json.load(f)
-            
-            # 如果是完整的线程数据结构
-            if isinstance(thread_data, dict) and 'thread' in thread_data:
-                thread = thread_data['thread']
-                title = thread_data.get('title', '')
-            # 如果直接是线程数组
-            elif isinstance(thread_data, list):
-                thread = thread_data
-                title = os.path.splitext(os.path.basename(thread_file))[0]
-            else:
+            loaded = load_thread_file(thread_file)
+            if loaded is None:
                 print(f"❌ Thread 文件格式错误: {thread_file}")
                 return False
+            thread, title = loaded
             
             return self.publish_thread(thread, title, delay_seconds)
             
-        except json.JSONDecodeError as e:
+        except JSON_ERRORS as e:
             print(f"❌ Thread 文件 JSON 格式错误: {str(e)}")
             return False
         except Exception as e:
             print(f"❌ 读取 Thread 文件失败: {str(e)}")
             return False
 
-    def _save_publish_result(self, published_tweets: List[Dict], title: str):
-        """保存发布结果"""
-        try:
-            from datetime import datetime
-            now = datetime.now()
-            date_folder = now.strftime("%Y-%m-%d")
-            timestamp = now.strftime("%H%M%S")
-            
-            # 创建发布记录目录
-            publish_dir = f"output/published/{date_folder}"
-            os.makedirs(publish_dir, exist_ok=True)
-            
-            filename = f"{publish_dir}/twitter_published_{timestamp}.json"
-            
-            publish_data = {
-                "title": title,
-                "published_at": now.strftime("%Y-%m-%d %H:%M:%S"),
-                "total_tweets": len(published_tweets),
-                "status": "published",
-                "tweets": published_tweets,
-                "thread_url": f"https://twitter.com/{self.username}/status/{published_tweets[0]['tweet_id']}" if published_tweets else ""
-            }
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(publish_data, f, ensure_ascii=False, indent=2)
-            
-            print(f"💾 发布记录已保存: {filename}")
-            
-        except Exception as e:
-            print(f"⚠️ 保存发布记录失败: {e}")
-
-    def _save_partial_result(self, published_tweets: List[Dict], title: str):
-        """保存部分发布结果（发布中断时使用）"""
+    def _save_result(self, published_tweets: List[Dict], title: str, status: str = "published"):
+        """
+        保存发布结果
+        
+        Args:
+            published_tweets: 已发布的推文列表
+            title: Thread 标题
+            status: "published" 完整发布，"partial" 发布中断时的部分结果
+        """
+        partial = status == "partial"
+        label = "部分发布记录" if partial else "发布记录"
         try:
-            from datetime import datetime
             now = datetime.now()
             date_folder = now.strftime("%Y-%m-%d")
             timestamp = now.strftime("%H%M%S")
             
-            # 创建发布记录目录
-            publish_dir = f"output/published/{date_folder}"
-            os.makedirs(publish_dir, exist_ok=True)
+            # 创建发布记录目录（同一进程内每个目录只创建一次）
+            publish_dir = _ensure_dir(f"output/published/{date_folder}")
             
-            filename = f"{publish_dir}/twitter_partial_{timestamp}.json"
+            filename = f"{publish_dir}/twitter_{status}_{timestamp}.json"
             
             publish_data = {
                 "title": title,
                 "published_at": now.strftime("%Y-%m-%d %H:%M:%S"),
                 "total_tweets": len(published_tweets),
-                "status": "partial",
-                "tweets": published_tweets,
-                "thread_url": f"https://twitter.com/{self.username}/status/{published_tweets[0]['tweet_id']}" if published_tweets else "",
-                "note": "部分发布，后续推文发布失败"
+                "status": status,
+                "thread_url": f"{self._url_prefix}{published_tweets[0]['tweet_id']}" if published_tweets else ""
             }
+            if partial:
+                publish_data["note"] = "部分发布，后续推文发布失败"
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(publish_data, f, ensure_ascii=False, indent=2)
+            _dump_publish_record(filename, publish_data, published_tweets)
             
-            print(f"💾 部分发布记录已保存: {filename}")
+            print(f"💾 {label}已保存: {filename}")
             
         except Exception as e:
-            print(f"⚠️ 保存部分发布记录失败: {e}")
+            print(f"⚠️ 保存{label}失败: {e}")
 
-    def test_connection(self) -> bool:
+    def test_connection(self, force: bool = False) -> bool:
         """
         测试 Twitter API 连接
         
+        Args:
+            force: 是否强制请求 get_me()；默认在缓存有效期内直接使用缓存的用户名
+        
         Returns:
             连接是否正常
         """
@@ -277,8 +378,8 @@ class TwitterPublisher:
             return False
         
         try:
-            me = self.client.get_me()
-            print(f"✅ Twitter API 连接正常: @{me.data.username}")
+            username = self._me(force=force)
+            print(f"✅ Twitter API 连接正常: @{username}")
             return True
         except Exception as e:
             print(f"❌ Twitter API 连接测试失败: {str(e)}")
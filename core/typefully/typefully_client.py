@@ -7,10 +7,48 @@ Typefully API 客户端
 
 import os
 import json
-import time
-import requests
-from typing import Dict, List, Optional, Union
-from datetime import datetime
+import functools
+from collections import defaultdict
+from typing import Dict, List, Optional
+from ..utils.rate_limiter import AdaptiveSemaphore
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# 草稿可选参数: (kwargs 参数名, 请求体字段名)
+DRAFT_OPTIONS = (
+    ('threadify', 'threadify'),
+    ('share', 'share'),
+    ('schedule_date', 'schedule-date'),
+    ('auto_retweet_enabled', 'auto_retweet_enabled'),
+    ('auto_plug_enabled', 'auto_plug_enabled'),
+)
+
+
+def _dumps_bytes(data) -> bytes:
+    """把请求数据序列化为 UTF-8 JSON 字节串，优先使用 orjson"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+@functools.lru_cache(maxsize=32)
+def _draft_template(fields: tuple) -> bytes:
+    """
+    生成草稿请求体模板，例如 b'{"content":%s,"share":%s}'
+    
+    草稿请求体的结构是固定的，只有可选字段的组合不同，
+    每种组合的模板只生成一次，之后只需要填入序列化后的字段值
+    """
+    parts = [b'{"content":%s']
+    for field in fields:
+        parts.append(b',' + _dumps_bytes(field) + b':%s')
+    parts.append(b'}')
+    return b''.join(parts)
 
 
 class TypefullyClient:
@@ -27,55 +65,116 @@ class TypefullyClient:
         if not self.api_key:
             raise ValueError("未找到 Typefully API Key，请设置环境变量 TYPEFULLY_API_KEY 或传入 api_key 参数")
         
+        # 调试模式下打印请求体和错误响应内容
+        self.debug = bool(os.getenv('TYPEFULLY_DEBUG'))
+        
         self.base_url = "https://api.typefully.com/v1"
+        # 各端点的完整 URL 在初始化时拼接好，请求时直接使用
+        self.url_drafts = self.base_url + "/drafts/"
+        self.url_recently_scheduled = self.base_url + "/drafts/recently-scheduled/"
+        self.url_recently_published = self.base_url + "/drafts/recently-published/"
+        self.url_notifications = self.base_url + "/notifications/"
         self.headers = {
             "X-API-KEY": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
         
-        print(f"✅ Typefully 客户端初始化成功")
+        # HTTP 库延迟到创建客户端时再导入，缩短模块导入时间
+        try:
+            # 优先使用 httpx 的 HTTP/2 连接：并发请求在同一个 TLS 连接上多路复用
+            import httpx
+            self.session = httpx.Client(
+                headers=self.headers,
+                timeout=httpx.Timeout(10.0, connect=3.0),  # (连接超时3秒, 读取超时10秒)
+                # 传入 transport 后 Client 的 http2/limits 参数不再生效，连接池配置需要写在 transport 上
+                transport=httpx.HTTPTransport(
+                    http2=True,
+                    retries=3,
+                    limits=httpx.Limits(max_connections=16, max_keepalive_connections=8)
+                )
+            )
+            self._timeout = None
+            self._body_kwarg = 'content'
+            self._request_errors = (httpx.HTTPError,)
+        except ImportError:
+            # 未安装 httpx[http2] 时回退到 requests，复用同一个 Session 保持 keep-alive 连接
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            
+            self.session = requests.Session()
+            self.session.headers.update(self.headers)
+            retry_strategy = Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504]
+            )
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry_strategy)
+            self.session.mount("https://", adapter)
+            self._timeout = (3, 10)  # (连接超时3秒, 读取超时10秒)
+            self._body_kwarg = 'data'
+            self._request_errors = (requests.exceptions.RequestException,)
+        
+        # 按端点记录服务端限流配额，配额用完时主动等待而不是撞上 429
+        self._sem = defaultdict(lambda: AdaptiveSemaphore(default=5))
+        
+        print("✅ Typefully 客户端初始化成功")
     
-    def _make_request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
+    def _make_request(self, method: str, url: str, data: Dict = None, body: bytes = None) -> Dict:
         """
         发送请求到 Typefully API
         
         Args:
             method: HTTP 方法 (GET, POST, PUT, DELETE)
-            endpoint: API 端点
+            url: 完整的 API 端点 URL（见 self.url_*）
             data: 请求数据
+            body: 已序列化的 JSON 请求体，提供时直接发送，不再由 HTTP 库重新编码
             
         Returns:
             API 响应
         """
-        url = f"{self.base_url}{endpoint}"
+        sem = self._sem[url]
         
         try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=self.headers, params=data)
-            elif method.upper() == "POST":
-                response = requests.post(url, headers=self.headers, json=data)
-            elif method.upper() == "PUT":
-                response = requests.put(url, headers=self.headers, json=data)
-            elif method.upper() == "DELETE":
-                response = requests.delete(url, headers=self.headers)
-            else:
+            sem.acquire()
+            
+            method = method.upper()
+            if method not in ("GET", "POST", "PUT", "DELETE"):
                 raise ValueError(f"不支持的 HTTP 方法: {method}")
             
-            # 打印请求详情（调试用）
+            kwargs = {}
+            if self._timeout is not None:
+                kwargs['timeout'] = self._timeout
+            
+            if body is not None:
+                kwargs[self._body_kwarg] = body
+            elif method in ("POST", "PUT"):
+                kwargs['json'] = data
+            elif method == "GET":
+                kwargs['params'] = data
+            response = self.session.request(method, url, **kwargs)
+            
+            sem.update_from_headers(response.headers)
+            
+            # 打印请求详情（请求体只在调试模式下序列化输出）
             print(f"🔍 API 请求: {method} {url}")
-            print(f"📤 请求数据: {json.dumps(data, ensure_ascii=False) if data else 'None'}")
+            if self.debug:
+                if body is None:
+                    body = _dumps_bytes(data) if data else b'None'
+                print(f"📤 请求数据: {body.decode('utf-8')}")
             print(f"📥 响应状态: {response.status_code}")
             
             if response.status_code == 200 or response.status_code == 201:
                 result = response.json()
-                print(f"✅ API 请求成功")
+                print("✅ API 请求成功")
                 return result
             else:
                 print(f"❌ API 请求失败: {response.status_code}")
-                print(f"📄 错误信息: {response.text}")
+                if self.debug:
+                    print(f"📄 错误信息: {response.text}")
                 return None
                 
-        except requests.exceptions.RequestException as e:
+        except self._request_errors as e:
             print(f"❌ 网络请求失败: {str(e)}")
             return None
         except json.JSONDecodeError as e:
@@ -85,6 +184,19 @@ class TypefullyClient:
             print(f"❌ 未知错误: {str(e)}")
             return None
     
+    def close(self):
+        """关闭 Session，释放连接池"""
+        session = getattr(self, 'session', None)
+        if session is not None:
+            session.close()
+            self.session = None
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
     def create_draft(self, content: str, **kwargs) -> Optional[Dict]:
         """
         创建草稿
@@ -101,21 +213,17 @@ class TypefullyClient:
         Returns:
             创建的草稿信息
         """
-        data = {"content": content}
-        
-        # 添加可选参数
-        if kwargs.get('threadify'):
-            data['threadify'] = kwargs['threadify']
-        if kwargs.get('share'):
-            data['share'] = kwargs['share']
-        if kwargs.get('schedule_date'):
-            data['schedule-date'] = kwargs['schedule_date']
-        if kwargs.get('auto_retweet_enabled'):
-            data['auto_retweet_enabled'] = kwargs['auto_retweet_enabled']
-        if kwargs.get('auto_plug_enabled'):
-            data['auto_plug_enabled'] = kwargs['auto_plug_enabled']
-        
-        return self._make_request("POST", "/drafts/", data)
+        # 添加可选参数（只包含有值的字段）
+        fields = []
+        values = [_dumps_bytes(content)]
+        for option, field in DRAFT_OPTIONS:
+            if kwargs.get(option):
+                fields.append(field)
+                values.append(_dumps_bytes(kwargs[option]))
+        
+        # 按字段组合取缓存的模板，只序列化各字段值，直接作为请求体发送
+        body = _draft_template(tuple(fields)) % tuple(values)
+        return self._make_request("POST", self.url_drafts, body=body)
     
     def create_thread_draft(self, tweets: List[str], **kwargs) -> Optional[Dict]:
         """
@@ -140,7 +248,7 @@ class TypefullyClient:
         Returns:
             最近计划的草稿列表
         """
-        return self._make_request("GET", "/drafts/recently-scheduled/")
+        return self._make_request("GET", self.url_recently_scheduled)
     
     def get_recently_published(self) -> Optional[List[Dict]]:
         """
@@ -149,7 +257,7 @@ class TypefullyClient:
         Returns:
             最近发布的草稿列表
         """
-        return self._make_request("GET", "/drafts/recently-published/")
+        return self._make_request("GET", self.url_recently_published)
     
     def get_notifications(self) -> Optional[List[Dict]]:
         """
@@ -158,7 +266,7 @@ class TypefullyClient:
         Returns:
             通知列表
         """
-        return self._make_request("GET", "/notifications/")
+        return self._make_request("GET", self.url_notifications)
     
     def test_connection(self) -> bool:
         """
@@ -6,11 +6,10 @@ Typefully 发布管理器
 """
 
 import os
-import json
-import time
-from datetime import datetime
+import concurrent.futures
 from typing import Dict, List, Optional
 from .typefully_client import TypefullyClient
+from ..utils.thread_file import load_thread_file, JSON_ERRORS
 
 
 class TypefullyPublisher:
@@ -70,7 +69,7 @@ class TypefullyPublisher:
                 print(f"📝 线程标题: {title}")
             
             # 预览推文内容
-            print(f"\n📱 线程预览:")
+            print("\n📱 线程预览:")
             for i, tweet in enumerate(tweets, 1):
                 print(f"{i}/{len(tweets)}: {tweet[:100]}{'...' if len(tweet) > 100 else ''}")
             
@@ -78,7 +77,7 @@ class TypefullyPublisher:
             result = self.client.create_thread_draft(tweets, **kwargs)
             
             if result:
-                print(f"✅ 线程草稿创建成功")
+                print("✅ 线程草稿创建成功")
                 
                 # 打印结果信息
                 if 'id' in result:
@@ -90,7 +89,7 @@ class TypefullyPublisher:
                 
                 return True
             else:
-                print(f"❌ 线程草稿创建失败")
+                print("❌ 线程草稿创建失败")
                 return False
                 
         except Exception as e:
@@ -115,24 +114,15 @@ class TypefullyPublisher:
             return False
         
         try:
-            with open(thread_file, 'r', encoding='utf-8') as f:
-                thread_data = json.load(f)
-            
-            # 如果是完整的线程数据结构
-            if isinstance(thread_data, dict) and 'thread' in thread_data:
-                thread = thread_data['thread']
-                title = thread_data.get('title', '')
-            # 如果直接是线程数组
-            elif isinstance(thread_data, list):
-                thread = thread_data
-                title = os.path.splitext(os.path.basename(thread_file))[0]
-            else:
+            loaded = load_thread_file(thread_file)
+            if loaded is None:
                 print(f"❌ 线程文件格式错误: {thread_file}")
                 return False
+            thread, title = loaded
             
             return self.publish_thread(thread, title, **kwargs)
             
-        except json.JSONDecodeError as e:
+        except JSON_ERRORS as e:
             print(f"❌ 线程文件 JSON 格式错误: {str(e)}")
             return False
         except Exception as e:
@@ -172,9 +162,12 @@ class TypefullyPublisher:
             return None
         
         try:
-            # 获取最近计划和发布的草稿
-            scheduled = self.client.get_recently_scheduled() or []
-            published = self.client.get_recently_published() or []
+            # 并发获取最近计划和发布的草稿（两个请求互不依赖，共享连接池）
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                scheduled_future = executor.submit(self.client.get_recently_scheduled)
+                published_future = executor.submit(self.client.get_recently_published)
+                scheduled = scheduled_future.result() or []
+                published = published_future.result() or []
             
             # 合并并排序
             all_drafts = scheduled + published
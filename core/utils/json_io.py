@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 序列化工具
+安装了 orjson 时使用 orjson（C 扩展，直接输出 UTF-8 字节），否则回退到标准库 json
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps_bytes(data: Any, indent: bool = False) -> bytes:
+    """
+    序列化为 UTF-8 JSON 字节串（保留中文，不转义为 \\uXXXX）
+
+    Args:
+        data: 要序列化的数据
+        indent: 是否使用 2 空格缩进
+
+    Returns:
+        JSON 字节串
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS if indent else orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """
+    解析 JSON 字符串或字节串，优先使用 orjson
+
+    解析失败时抛出 json.JSONDecodeError（orjson.JSONDecodeError 是它的子类）
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_file(data: Any, filename: str, indent: bool = True):
+    """把数据序列化后一次性写入文件"""
+    with open(filename, 'wb') as f:
+        f.write(dumps_bytes(data, indent=indent))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 响应缓存
+相同提示词的请求直接从本地 SQLite 读取结果，不再重复调用 API
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Optional
+
+# 默认缓存有效期：30 天
+DEFAULT_TTL = 30 * 86400
+
+
+class LLMCache:
+    """
+    基于 SQLite 的 LLM 响应缓存
+
+    按提示词内容的 SHA256 精确匹配，值以 JSON 形式保存，支持过期时间。
+    使用标准库 sqlite3，可以在多个线程之间共享同一个实例
+    """
+
+    def __init__(self, path: str, ttl: int = DEFAULT_TTL):
+        """
+        Args:
+            path: 缓存数据库文件路径
+            ttl: 缓存有效期（秒）
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL 模式下读缓存不会被其他进程的写入阻塞
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """把模型、提示词、温度等参数拼成缓存键"""
+        raw = json.dumps(parts, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存
+
+        Returns:
+            缓存的值，未命中或已过期时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """写入缓存（覆盖同名键）"""
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, data, time.time() + self.ttl)
+            )
+            self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -7,29 +7,75 @@
 
 import os
 import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
 from datetime import datetime
 from typing import TextIO
 
 
+def _write_fd(fd: int, text: str):
+    """编码后直接用 os.write 写入文件描述符，绕过 TextIOWrapper/BufferedWriter"""
+    data = memoryview(text.encode('utf-8'))
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
+
+
+class BufferedLogWriter:
+    """
+    日志文件缓冲写入器
+    
+    先把文本攒在内存里，累计超过阈值且遇到换行时才一次性写入文件，
+    避免每次 print 都触发一次写文件和 flush。stdout 和 stderr 共用同一个实例，
+    保证两者在日志文件中的先后顺序。写入直接使用 os.write，每批只有一次 write 系统调用
+    """
+    
+    def __init__(self, log_fd: int, threshold: int = 8192):
+        self.log_fd = log_fd
+        self.threshold = threshold
+        self._buf = []
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def write(self, text: str):
+        with self._lock:
+            self._buf.append(text)
+            self._size += len(text)
+            if self._size >= self.threshold and '\n' in text:
+                self._drain()
+    
+    def _drain(self):
+        """把缓冲区内容一次性写入文件（调用方需持有锁）"""
+        if self._buf:
+            _write_fd(self.log_fd, ''.join(self._buf))
+            self._buf.clear()
+            self._size = 0
+    
+    def flush(self):
+        with self._lock:
+            self._drain()
+
+
 class DualOutput:
     """双重输出类 - 同时输出到控制台和文件"""
     
-    def __init__(self, original_stream: TextIO, log_file: TextIO):
+    def __init__(self, original_stream: TextIO, log_writer: BufferedLogWriter):
         self.original_stream = original_stream
-        self.log_file = log_file
+        self.log_writer = log_writer
     
     def write(self, text: str):
-        # 写入到原始流（控制台）
+        # 写入到原始流（控制台），立即刷新保持终端实时
         self.original_stream.write(text)
-        # 写入到日志文件
-        self.log_file.write(text)
-        # 确保实时写入
         self.original_stream.flush()
-        self.log_file.flush()
+        # 写入到日志缓冲区，由缓冲区按批写入文件
+        self.log_writer.write(text)
     
     def flush(self):
         self.original_stream.flush()
-        self.log_file.flush()
+        self.log_writer.flush()
     
     def __getattr__(self, name):
         # 转发其他属性到原始流
@@ -41,7 +87,8 @@ class Logger:
     
     def __init__(self, log_file_path: str = "run.log"):
         self.log_file_path = log_file_path
-        self.log_file = None
+        self._log_fd = None
+        self.log_writer = None
         self.original_stdout = None
         self.original_stderr = None
         self.dual_stdout = None
@@ -54,24 +101,29 @@ class Logger:
             if os.path.exists(self.log_file_path):
                 os.remove(self.log_file_path)
             
-            # 创建新的日志文件
-            self.log_file = open(self.log_file_path, 'w', encoding='utf-8')
+            # 创建新的日志文件（原始文件描述符，直接 os.write 写入）
+            self._log_fd = os.open(self.log_file_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
             
             # 写入日志头部信息
             start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.log_file.write(f"=== AutoX 运行日志 ===\n")
-            self.log_file.write(f"开始时间: {start_time}\n")
-            self.log_file.write(f"Python版本: {sys.version}\n")
-            self.log_file.write(f"工作目录: {os.getcwd()}\n")
-            self.log_file.write("=" * 60 + "\n\n")
+            _write_fd(self._log_fd,
+                      f"=== AutoX 运行日志 ===\n"
+                      f"开始时间: {start_time}\n"
+                      f"Python版本: {sys.version}\n"
+                      f"工作目录: {os.getcwd()}\n"
+                      + "=" * 60 + "\n\n")
             
             # 保存原始的输出流
             self.original_stdout = sys.stdout
             self.original_stderr = sys.stderr
             
-            # 创建双重输出流
-            self.dual_stdout = DualOutput(self.original_stdout, self.log_file)
-            self.dual_stderr = DualOutput(self.original_stderr, self.log_file)
+            # 创建双重输出流（共用同一个日志缓冲区）
+            self.log_writer = BufferedLogWriter(self._log_fd)
+            self.dual_stdout = DualOutput(self.original_stdout, self.log_writer)
+            self.dual_stderr = DualOutput(self.original_stderr, self.log_writer)
+            
+            # 进程异常退出时也把缓冲区写入文件
+            atexit.register(self._flush_log_writer)
             
             # 重定向标准输出和错误输出
             sys.stdout = self.dual_stdout
@@ -92,16 +144,22 @@ class Logger:
                 sys.stdout = self.original_stdout
                 sys.stderr = self.original_stderr
             
-            if self.log_file:
+            if self.log_writer:
+                # 先把缓冲区中的内容写入文件
+                self.log_writer.flush()
+                self.log_writer = None
+            
+            if self._log_fd is not None:
                 # 写入结束信息
                 end_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.log_file.write(f"\n\n" + "=" * 60 + "\n")
-                self.log_file.write(f"结束时间: {end_time}\n")
-                self.log_file.write("=== 日志记录结束 ===\n")
+                _write_fd(self._log_fd,
+                          f"\n\n" + "=" * 60 + "\n"
+                          f"结束时间: {end_time}\n"
+                          "=== 日志记录结束 ===\n")
                 
                 # 关闭日志文件
-                self.log_file.close()
-                self.log_file = None
+                os.close(self._log_fd)
+                self._log_fd = None
             
             print(f"📝 日志记录已停止: {self.log_file_path}")
             return True
@@ -110,6 +168,11 @@ class Logger:
             print(f"❌ 停止日志记录失败: {e}")
             return False
     
+    def _flush_log_writer(self):
+        """atexit 回调：刷新尚未写入文件的日志缓冲区"""
+        if self.log_writer and self._log_fd is not None:
+            self.log_writer.flush()
+    
     def __enter__(self):
         """上下文管理器入口"""
         self.start_logging()
@@ -153,4 +216,98 @@ def cleanup_logging():
     """清理日志记录"""
     global app_logger
     if app_logger:
-        app_logger.stop_logging()
\ No newline at end of file
+        app_logger.stop_logging()
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """始终写入当前的 sys.stdout（start_logging 替换 stdout 之后同样会写入日志文件）"""
+    
+    @property
+    def stream(self):
+        return sys.stdout
+    
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+_queue_handler = None
+_queue_listener = None
+# 监听线程是否在运行（atexit 停止后为 False），不依赖 QueueListener 的内部属性
+_queue_listener_running = False
+_queue_lock = threading.Lock()
+
+
+def get_queue_logger(name: str) -> logging.Logger:
+    """
+    获取通过队列异步输出的 logger
+    
+    调用方（包括工作线程）只是把日志记录放进队列，由单独的 IO 线程统一写到 stdout，
+    不会因为 print 的写入和刷新互相阻塞。输出格式只有消息本身，保留 emoji 风格
+    
+    Args:
+        name: logger 名称
+        
+    Returns:
+        配置好的 logger
+    """
+    global _queue_handler, _queue_listener, _queue_listener_running
+    logger = logging.getLogger(name)
+    with _queue_lock:
+        if _queue_listener is None:
+            log_queue = queue.SimpleQueue()
+            handler = _StdoutHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _queue_handler = logging.handlers.QueueHandler(log_queue)
+            _queue_listener = logging.handlers.QueueListener(log_queue, handler)
+            _queue_listener.start()
+            _queue_listener_running = True
+            atexit.register(_stop_queue_listener)
+        if _queue_handler not in logger.handlers:
+            logger.addHandler(_queue_handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def flush_queue_loggers():
+    """等待队列中已有的日志全部输出（之后的 print 不会排到这些日志前面）"""
+    with _queue_lock:
+        if _queue_listener_running:
+            # stop() 会处理完队列中剩余的记录再返回，随后重新启动监听线程
+            _queue_listener.stop()
+            _queue_listener.start()
+
+
+def _stop_queue_listener():
+    """atexit 回调：输出队列中剩余的日志并停止监听线程"""
+    global _queue_listener_running
+    with _queue_lock:
+        if _queue_listener_running:
+            _queue_listener.stop()
+            _queue_listener_running = False
+
+
+def get_console_logger(name: str, fmt: str = '%(message)s', level: int = logging.DEBUG) -> logging.Logger:
+    """
+    获取直接输出到 stdout 的 logger
+    
+    调用位置（%(filename)s:%(lineno)d）由 logging 在记录日志时获取，
+    调用方通过 stacklevel 指定要记录的是哪一层调用者
+    
+    Args:
+        name: logger 名称
+        fmt: 日志格式
+        level: 日志级别
+        
+    Returns:
+        配置好的 logger
+    """
+    logger = logging.getLogger(name)
+    if not any(isinstance(h, _StdoutHandler) for h in logger.handlers):
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter(fmt))
+        logger.addHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = False
+    return logger
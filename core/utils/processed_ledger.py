@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已处理选题记录
+记录每个选题（按内容哈希）对应的处理结果，重复运行时跳过已处理的选题
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+from .json_io import dump_file
+
+
+class ProcessedLedger:
+    """
+    已处理选题的本地索引（JSON 文件）
+
+    键为选题内容 + 模板版本的 SHA1，值为当时的处理结果；
+    结果文件被删除后视为未处理。每次写入都通过临时文件 + os.replace 原子替换，
+    一批结果请用 record_many 一次写入，避免每条结果都重写整个文件
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 索引文件路径
+        """
+        self.path = path
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """由选题内容和模板版本等参数生成索引键"""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _load(self) -> Dict[str, Dict]:
+        """读取索引文件，文件不存在或损坏时返回空索引"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, key: str, file_field: str) -> Optional[Dict]:
+        """
+        查询已处理的结果
+
+        Args:
+            key: 索引键
+            file_field: 结果中保存文件路径的字段名，文件不存在时视为未处理
+
+        Returns:
+            之前的处理结果，未处理时返回 None
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            entry = self._entries.get(key)
+        if entry and entry.get(file_field) and os.path.exists(entry[file_field]):
+            return entry
+        return None
+
+    def record(self, key: str, result: Dict):
+        """记录单个处理结果并立即写入文件"""
+        self.record_many({key: result})
+
+    def record_many(self, results: Dict[str, Dict]):
+        """
+        批量记录处理结果，整批只读写一次索引文件（合并其他实例写入的内容）
+
+        Args:
+            results: 索引键 -> 处理结果
+        """
+        if not results:
+            return
+        with self._lock:
+            entries = self._load()
+            entries.update(results)
+            self._entries = entries
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            dump_file(entries, tmp_path, indent=False)
+            os.replace(tmp_path, self.path)
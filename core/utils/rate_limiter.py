@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+客户端限流工具
+根据服务端返回的限流响应头记住剩余配额，或按固定速率（令牌桶），在发请求前主动等待
+"""
+
+import time
+import asyncio
+import threading
+from typing import Mapping, Optional
+
+
+class AdaptiveSemaphore:
+    """
+    自适应限流信号量
+
+    记录服务端告知的剩余请求数和配额重置时间：
+    剩余配额大于 0 时直接放行；配额用完时阻塞到重置时间再放行，
+    避免并发调用方一起撞上 429
+    """
+
+    def __init__(self, default: int = 5):
+        """
+        Args:
+            default: 没有服务端信息时的默认配额（每个重置窗口）
+        """
+        self.default = default
+        self._remaining = default
+        self._reset_ts = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """获取一次请求配额，配额用完时阻塞到重置时间"""
+        with self._cond:
+            while True:
+                if self._remaining > 0:
+                    self._remaining -= 1
+                    return
+
+                now = time.time()
+                if now >= self._reset_ts:
+                    # 已过重置时间，恢复默认配额
+                    self._remaining = self.default
+                    continue
+
+                self._cond.wait(timeout=self._reset_ts - now)
+
+    def pacing_delay(self) -> Optional[float]:
+        """
+        按剩余配额把请求均匀分摊到重置时间之前，返回建议的请求间隔（秒）
+
+        Returns:
+            建议间隔；没有有效的限流信息（未知或已过重置时间）时返回 None
+        """
+        with self._cond:
+            now = time.time()
+            if self._reset_ts <= now:
+                return None
+            return (self._reset_ts - now) / max(1, self._remaining)
+
+    def update(self, remaining: Optional[int], reset_ts: Optional[float]):
+        """
+        使用服务端返回的限流信息更新配额
+
+        Args:
+            remaining: 当前窗口剩余请求数
+            reset_ts: 配额重置时间（Unix 时间戳，秒）
+        """
+        with self._cond:
+            if remaining is not None:
+                self._remaining = remaining
+            if reset_ts is not None:
+                self._reset_ts = reset_ts
+            self._cond.notify_all()
+
+    def update_from_headers(self, headers: Mapping[str, str],
+                            remaining_key: str = 'X-RateLimit-Remaining',
+                            reset_key: str = 'X-RateLimit-Reset'):
+        """
+        从响应头解析限流信息并更新配额，缺失或格式错误的字段会被忽略
+
+        Args:
+            headers: 响应头（requests 的响应头大小写不敏感）
+            remaining_key: 剩余请求数的响应头名称
+            reset_key: 重置时间的响应头名称
+        """
+        remaining = _parse_number(headers.get(remaining_key), int)
+        reset_ts = _parse_number(headers.get(reset_key), float)
+        if remaining is None and reset_ts is None:
+            return
+        self.update(remaining, reset_ts)
+
+
+def _parse_number(value: Optional[str], cast):
+    """解析响应头中的数字，失败时返回 None"""
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    令牌桶限流器
+
+    桶容量为 max_calls，每 period 秒补满；在发请求之前调用，
+    请求按服务商允许的速率发出，而不是在请求完成后固定等待。
+    同时支持线程（acquire / with 语句）和 asyncio（aacquire）两种用法
+    """
+
+    def __init__(self, max_calls: int, period: float = 60.0):
+        """
+        Args:
+            max_calls: 每个周期允许的最大请求数（如 RPM）
+            period: 周期长度（秒）
+        """
+        self.max_calls = max_calls
+        self.period = period
+        self._rate = max_calls / period
+        self._tokens = float(max_calls)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """预约一个令牌，返回需要等待的秒数（令牌不足时预支，由调用方按返回值等待）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_calls, self._tokens + (now - self._last) * self._rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def acquire(self):
+        """获取一个令牌，必要时阻塞当前线程"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        """获取一个令牌，必要时挂起当前协程（不阻塞事件循环）"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class AIMDConcurrency:
+    """
+    AIMD 自适应并发上限（加性增、乘性减）
+
+    遇到限流（429）时把并发上限减半；连续 increase_interval 秒没有被限流则上限加 1。
+    最终收敛到当前 API Key 能承受的最大并发，而不是固定的保守值。
+    通过 async with 使用，只用于 asyncio 协程；上限变化在下一个请求结束时生效
+    """
+
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: int = 32, increase_interval: float = 60.0):
+        """
+        Args:
+            initial: 初始并发上限
+            min_limit: 并发上限的下限
+            max_limit: 并发上限的上限
+            increase_interval: 无限流多长时间（秒）后把上限加 1
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase_interval = increase_interval
+        self.limit = max(min_limit, min(initial, max_limit))
+        self._in_flight = 0
+        self._window_start = time.monotonic()
+        # 每次减少上限后加 1：请求开始时记下 epoch，同一次拥塞中重叠的请求只触发一次减半
+        self.epoch = 0
+        # asyncio.Condition 绑定在首次使用它的事件循环上，每个事件循环单独创建
+        self._cond = None
+        self._cond_loop = None
+
+    def _get_cond(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._cond_loop is not loop:
+            self._cond = asyncio.Condition()
+            self._cond_loop = loop
+        return self._cond
+
+    def record_success(self):
+        """记录一次未被限流的请求，无限流窗口足够长时加性增加上限"""
+        now = time.monotonic()
+        if now - self._window_start >= self.increase_interval:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self._window_start = now
+
+    def record_throttle(self, epoch: Optional[int] = None) -> bool:
+        """
+        记录一次限流，乘性减少上限
+
+        Args:
+            epoch: 请求开始时的 self.epoch；此后上限已经减少过（同一次拥塞已处理）则不再减少
+
+        Returns:
+            是否减少了上限
+        """
+        if epoch is not None and epoch != self.epoch:
+            return False
+        self.limit = max(self.min_limit, self.limit // 2)
+        self._window_start = time.monotonic()
+        self.epoch += 1
+        return True
+
+    async def __aenter__(self):
+        cond = self._get_cond()
+        async with cond:
+            await cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        cond = self._get_cond()
+        async with cond:
+            self._in_flight -= 1
+            cond.notify_all()
+        return False
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败 fail_max 次后断开（open），reset_timeout 秒内的请求直接拒绝，不再占用线程等待超时；
+    超时后进入半开（half_open）状态，只放行一个试探请求：成功则恢复，失败则重新断开。
+    上游持续 5xx / 429 时，调用方快速失败，避免重试把故障放大
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            fail_max: 连续失败多少次后断开
+            reset_timeout: 断开后多少秒允许试探请求
+        """
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于拒绝请求的状态（只查询，不占用半开状态的试探名额）"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at < self.reset_timeout
+            return self.state == self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """当前是否允许发出请求"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # 断开时间已到：放行一个试探请求，其余请求在结果出来前继续被拒绝
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        """记录一次成功请求，恢复为闭合状态"""
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        """记录一次失败请求，连续失败达到阈值或试探失败时断开"""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.fail_max:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Thread 文件读取工具
+支持两种格式：{"title": ..., "thread": [...]} 或直接的推文数组
+"""
+
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+    # ijson 与标准库的解析错误统一捕获
+    JSON_ERRORS = (json.JSONDecodeError, ijson.JSONError)
+except ImportError:
+    IJSON_AVAILABLE = False
+    JSON_ERRORS = (json.JSONDecodeError,)
+
+
+def _first_char(f) -> bytes:
+    """返回文件中第一个非空白字节，并把文件指针移回开头"""
+    while True:
+        chunk = f.read(1)
+        if not chunk or not chunk.isspace():
+            break
+    f.seek(0)
+    return chunk
+
+
+def load_thread_file(thread_file: str) -> Optional[Tuple[List[Dict], str]]:
+    """
+    读取 Thread 文件
+
+    安装了 ijson 时流式解析，不需要先把整个文件读成字符串再构建完整对象，
+    大文件的峰值内存更低；未安装时回退到 json.load
+
+    Args:
+        thread_file: Thread 文件路径
+
+    Returns:
+        (thread, title)，文件格式不正确时返回 None
+
+    Raises:
+        JSON_ERRORS 中的解析错误
+    """
+    default_title = os.path.splitext(os.path.basename(thread_file))[0]
+
+    if not IJSON_AVAILABLE:
+        with open(thread_file, 'r', encoding='utf-8') as f:
+            thread_data = json.load(f)
+
+        # 如果是完整的线程数据结构
+        if isinstance(thread_data, dict) and 'thread' in thread_data:
+            return thread_data['thread'], thread_data.get('title', '')
+        # 如果直接是线程数组
+        if isinstance(thread_data, list):
+            return thread_data, default_title
+        return None
+
+    with open(thread_file, 'rb') as f:
+        first = _first_char(f)
+
+        # 如果直接是线程数组，逐条解析推文
+        if first == b'[':
+            return list(ijson.items(f, 'item', use_float=True)), default_title
+
+        # 如果是完整的线程数据结构，只取需要的顶层字段
+        if first == b'{':
+            thread, title = None, ''
+            for key, value in ijson.kvitems(f, '', use_float=True):
+                if key == 'thread':
+                    thread = value
+                elif key == 'title':
+                    title = value
+            if thread is not None:
+                return thread, title
+
+    return None
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+选题文件读取
+每行一个选题，忽略空行
+"""
+
+import os
+import mmap
+import functools
+from typing import List, Tuple
+
+UTF8_BOM = b'\xef\xbb\xbf'
+
+
+def read_topic_lines(path: str) -> List[str]:
+    """
+    读取选题文件，返回去除首尾空白后的非空行
+
+    解析结果按 (路径, 修改时间, 大小) 缓存，长时间运行的进程重复读取未修改的文件时不再解析
+
+    Args:
+        path: 选题文件路径
+
+    Returns:
+        选题列表（每次返回新的列表，调用方可以直接修改）
+    """
+    st = os.stat(path)
+    return list(_read_topic_lines_cached(path, st.st_mtime_ns, st.st_size))
+
+
+@functools.lru_cache(maxsize=4)
+def _read_topic_lines_cached(path: str, mtime_ns: int, size: int) -> Tuple[str, ...]:
+    """
+    解析选题文件（mtime_ns 和 size 只作为缓存键，文件修改后自动重新解析）
+
+    文件通过 mmap 映射后一次性按行切分，不逐行经过文本文件的解码缓冲区；
+    空文件无法映射，直接返回空元组
+    """
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 0 字节的文件
+            return ()
+        with mm:
+            data = mm.read()
+
+    if data.startswith(UTF8_BOM):
+        data = data[len(UTF8_BOM):]
+
+    topics = []
+    for line in data.splitlines():
+        topic = line.decode('utf-8').strip()
+        if topic:
+            topics.append(topic)
+    return tuple(topics)
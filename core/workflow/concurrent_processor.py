@@ -7,12 +7,16 @@
 
 import asyncio
 import concurrent.futures
+import hashlib
 from typing import Dict, List, Optional, Tuple, Callable
 from datetime import datetime
-import json
 import os
-import time
 from ..gpt.rewriter import GPTRewriter
+from ..gpt.gpt_client import gpt_client
+from ..utils.rate_limiter import RateLimiter, AIMDConcurrency
+from ..utils.processed_ledger import ProcessedLedger
+from ..utils.json_io import dumps_bytes
+from ..utils.logger import get_queue_logger, flush_queue_loggers
 from ..image.batch_prompt_generator import batch_prompt_generator
 from ..image.smart_prompt_matcher import smart_prompt_matcher
 
@@ -20,10 +24,30 @@ from ..image.smart_prompt_matcher import smart_prompt_matcher
 class ConcurrentProcessor:
     """并发处理器"""
     
-    def __init__(self, max_workers: int = 3):  # 降低并发数从5到3以减少API超时风险
+    def __init__(self, max_workers: int = 3, rpm: Optional[int] = None):  # 降低并发数从5到3以减少API超时风险
+        """
+        Args:
+            max_workers: 最大并发数
+            rpm: 每分钟最多发出的改写请求数，默认 max_workers * 30
+        """
         self.max_workers = max_workers
+        self.rpm = rpm or max_workers * 30
+        # 在发请求前按 RPM 限流，取代每个结果完成后的固定等待
+        self.limiter = RateLimiter(max_calls=self.rpm, period=60)
+        # 异步改写的并发上限从 max_workers 开始，按是否被限流自动调整（AIMD）
+        self.concurrency = AIMDConcurrency(initial=max_workers)
+        # 已处理选题索引：重复运行时跳过 thread 文件仍然存在的选题
+        self.use_ledger = True
+        self.ledger = ProcessedLedger("output/.processed_index.json")
+        # 专用的写文件线程：改写完成后把 thread 文件交给它保存，工作线程立即去处理下一个选题
+        self._writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="thread-writer")
         self.batch_generator = batch_prompt_generator
         self.smart_matcher = smart_prompt_matcher
+        self._template_count = None
+        # 本次运行中已经创建过的目录，同一目录不再重复调用 os.makedirs
+        self._mkdir_cache = set()
+        # 并发进度日志经队列由单独的线程输出，收集结果的循环不会被 stdout 写入阻塞
+        self.log = get_queue_logger("concurrent_processor")
     
     def process_topics_concurrently(self, 
                                    topics: List[Dict[str, str]], 
@@ -86,179 +110,313 @@ class ConcurrentProcessor:
     
     def _process_content_concurrently(self, topics: List[Dict[str, str]], english_mode: bool, template_type: str = "twitter") -> List[Dict[str, any]]:
         """并发处理内容改写"""
+        if not topics:
+            return []
+        
         try:
             rewriter = GPTRewriter(template_type=template_type)
         except Exception as e:
             print(f"❌ GPT改写器初始化失败: {e}")
             return []
         
-        results = []
+        # 跳过之前已处理过的选题（相同选题 + 相同模板和语言），直接复用当时的结果
+        # 结果按选题原顺序预分配，跳过的选题直接放回原位置
+        results = [None] * len(topics)
+        pending_idx = []
+        for idx, topic in enumerate(topics):
+            previous = self.ledger.get(self._ledger_key(rewriter, topic, english_mode), 'thread_file') if self.use_ledger else None
+            if previous:
+                results[idx] = previous
+            else:
+                pending_idx.append(idx)
+        skipped = len(topics) - len(pending_idx)
+        if skipped:
+            self.log.info("   ⏭️ 跳过 %s 个已处理的选题", skipped)
+        pending_topics = [topics[idx] for idx in pending_idx]
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有正在运行的事件循环：用 asyncio 在单线程内并发等待所有 API 请求
+            new_results = asyncio.run(self._aprocess_content(rewriter, pending_topics, english_mode))
+        else:
+            # 已在事件循环中（无法嵌套 asyncio.run），回退到线程池
+            new_results = self._process_content_threaded(rewriter, pending_topics, english_mode)
+        self._resolve_thread_files(new_results)
+        
+        # 新结果放回各自的位置，成功的结果整批写入索引
+        for idx, result in zip(pending_idx, new_results):
+            results[idx] = result
+        self.ledger.record_many({
+            self._ledger_key(rewriter, result['topic'], english_mode): result
+            for result in new_results if result['success']
+        })
+        
+        successful_count = sum(1 for r in results if r['success'])
+        self.log.info("📊 内容改写完成: 成功 %s/%s", successful_count, len(topics))
+        # 确保进度日志都已输出，再继续后续步骤的 print
+        flush_queue_loggers()
+        
+        return results
+    
+    async def _aprocess_content(self, rewriter: GPTRewriter, topics: List[Dict[str, str]], english_mode: bool) -> List[Dict[str, any]]:
+        """用 asyncio 并发处理内容改写，AIMD 并发上限限制同时进行的请求数"""
+        async def bounded(index: int, topic: Dict[str, str]) -> Tuple[int, Dict[str, any]]:
+            async with self.concurrency:
+                hits = gpt_client.rate_limit_hits
+                epoch = self.concurrency.epoch
+                result = await self._aprocess_single_content(rewriter, topic, english_mode)
+                # 请求期间出现过 429 则减半并发上限（同一次限流只由第一个观察到的请求减半），否则计入无限流窗口
+                if gpt_client.rate_limit_hits != hits:
+                    if self.concurrency.record_throttle(epoch):
+                        self.log.info("   ⚠️ 触发限流，并发上限降为 %s", self.concurrency.limit)
+                else:
+                    self.concurrency.record_success()
+                return index, result
+        
+        if not topics:
+            return []
+        
+        # 结果按选题原顺序预先分配，完成后按下标写入
+        results = [None] * len(topics)
+        tasks = [asyncio.ensure_future(bounded(idx, topic)) for idx, topic in enumerate(topics)]
+        
+        # 按完成顺序收集结果
+        for i, next_done in enumerate(asyncio.as_completed(tasks), 1):
+            idx, result = await next_done
+            results[idx] = result
+            self._print_content_progress(i, len(topics), result)
+        
+        return results
+    
+    def _process_content_threaded(self, rewriter: GPTRewriter, topics: List[Dict[str, str]], english_mode: bool) -> List[Dict[str, any]]:
+        """用线程池并发处理内容改写（无法使用 asyncio 时的回退方案）"""
+        if not topics:
+            return []
+        
+        # 结果按选题原顺序预先分配，完成后按下标写入
+        results = [None] * len(topics)
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             # 提交所有任务
-            future_to_topic = {
-                executor.submit(self._process_single_content, rewriter, topic, english_mode): topic
-                for topic in topics
+            future_to_idx = {
+                executor.submit(self._process_single_content, rewriter, topic, english_mode): idx
+                for idx, topic in enumerate(topics)
             }
             
             # 收集结果
-            for i, future in enumerate(concurrent.futures.as_completed(future_to_topic), 1):
-                topic = future_to_topic[future]
+            for i, future in enumerate(concurrent.futures.as_completed(future_to_idx), 1):
+                idx = future_to_idx[future]
+                topic = topics[idx]
                 topic_title = topic.get('title', '未知选题')
                 
                 try:
                     result = future.result()
-                    results.append(result)
-                    
-                    if result['success']:
-                        thread_count = len(result['thread']) if result['thread'] else 0
-                        print(f"   ✅ {i}/{len(topics)} 完成: {topic_title} ({thread_count}条推文)")
-                    else:
-                        print(f"   ❌ {i}/{len(topics)} 失败: {topic_title}")
+                    results[idx] = result
+                    self._print_content_progress(i, len(topics), result)
                         
                 except Exception as e:
-                    print(f"   ❌ {i}/{len(topics)} 异常: {topic_title} - {e}")
-                    results.append({
-                        'topic': topic,
-                        'thread': None,
-                        'thread_file': None,
-                        'success': False,
-                        'error': str(e)
-                    })
-                
-                # 添加延时避免过度并发和API超时
-                time.sleep(1.0)  # 增加延时从0.5秒到1秒
-        
-        successful_count = sum(1 for r in results if r['success'])
-        print(f"📊 内容改写完成: 成功 {successful_count}/{len(topics)}")
+                    self.log.info("   ❌ %s/%s 异常: %s - %s", i, len(topics), topic_title, e)
+                    results[idx] = self._content_result(topic, None, error=str(e))
         
         return results
     
+    def _ledger_key(self, rewriter: GPTRewriter, topic: Dict[str, str], english_mode: bool) -> str:
+        """已处理选题索引的键：选题内容 + 改写模板 + 语言"""
+        return ProcessedLedger.make_key(topic, rewriter.thread_prompt, english_mode)
+    
+    def _print_content_progress(self, index: int, total: int, result: Dict[str, any]):
+        """打印单个选题的改写进度"""
+        topic_title = result['topic'].get('title', '未知选题')
+        if result['success']:
+            thread_count = len(result['thread']) if result['thread'] else 0
+            self.log.info("   ✅ %s/%s 完成: %s (%s条推文)", index, total, topic_title, thread_count)
+        else:
+            self.log.info("   ❌ %s/%s 失败: %s", index, total, topic_title)
+    
+    def _content_result(self, topic: Dict[str, str], thread: Optional[List[Dict[str, str]]],
+                        thread_file: Optional[str] = None, error: str = '内容改写失败') -> Dict[str, any]:
+        """构建单个选题的内容改写结果"""
+        if thread:
+            return {
+                'topic': topic,
+                'thread': thread,
+                'thread_file': thread_file,
+                'success': True
+            }
+        return {
+            'topic': topic,
+            'thread': None,
+            'thread_file': None,
+            'success': False,
+            'error': error
+        }
+    
+    def _note_fields(self, topic: Dict[str, str]) -> Dict[str, any]:
+        """从选题中取出改写器需要的笔记字段"""
+        return {
+            'title': topic['title'],
+            'description': topic['controversy'],
+            'tags': topic['keywords'],
+            'summary': topic.get('summary', ''),
+            'conclusion': topic.get('conclusion', ''),
+            'level': topic.get('level', 3)
+        }
+    
+    async def _aprocess_single_content(self, rewriter: GPTRewriter, topic: Dict[str, str], english_mode: bool) -> Dict[str, any]:
+        """异步处理单个选题的内容改写"""
+        # 熔断期间直接失败，不占用限流令牌，也不等待请求超时
+        if gpt_client.breaker.is_open:
+            return self._content_result(topic, None, error='circuit_open')
+        
+        try:
+            await self.limiter.aacquire()
+            thread = await rewriter.arewrite_note(english_mode, **self._note_fields(topic))
+            
+            thread_file = None
+            if thread:
+                # 保存thread文件（交给写文件线程，不阻塞事件循环，也不等待写入完成）
+                thread_file = self._writer.submit(rewriter.save_thread, thread, topic_title=topic['title'])
+            
+            return self._content_result(topic, thread, thread_file)
+                
+        except Exception as e:
+            return self._content_result(topic, None, error=str(e))
+    
     def _process_single_content(self, rewriter: GPTRewriter, topic: Dict[str, str], english_mode: bool) -> Dict[str, any]:
         """处理单个选题的内容改写"""
+        if gpt_client.breaker.is_open:
+            return self._content_result(topic, None, error='circuit_open')
+        
         try:
-            # 使用改写器处理内容
-            if english_mode:
-                thread = rewriter.rewrite_note_to_english_thread(
-                    title=topic['title'],
-                    description=topic['controversy'],
-                    tags=topic['keywords'],
-                    summary=topic.get('summary', ''),
-                    conclusion=topic.get('conclusion', ''),
-                    level=topic.get('level', 3)
-                )
-            else:
-                thread = rewriter.rewrite_note_to_thread(
-                    title=topic['title'],
-                    description=topic['controversy'],
-                    tags=topic['keywords'],
-                    summary=topic.get('summary', ''),
-                    conclusion=topic.get('conclusion', ''),
-                    level=topic.get('level', 3)
-                )
+            # 使用改写器处理内容（按 RPM 限流后再发请求）
+            with self.limiter:
+                if english_mode:
+                    thread = rewriter.rewrite_note_to_english_thread(**self._note_fields(topic))
+                else:
+                    thread = rewriter.rewrite_note_to_thread(**self._note_fields(topic))
             
+            thread_file = None
             if thread:
-                # 保存thread文件
-                thread_filename = rewriter.save_thread(thread, topic_title=topic['title'])
-                
-                return {
-                    'topic': topic,
-                    'thread': thread,
-                    'thread_file': thread_filename,
-                    'success': True
-                }
-            else:
-                return {
-                    'topic': topic,
-                    'thread': None,
-                    'thread_file': None,
-                    'success': False,
-                    'error': '内容改写失败'
-                }
+                # 保存thread文件（交给写文件线程，工作线程不等待磁盘写入）
+                thread_file = self._writer.submit(rewriter.save_thread, thread, topic_title=topic['title'])
+            
+            return self._content_result(topic, thread, thread_file)
                 
         except Exception as e:
-            return {
-                'topic': topic,
-                'thread': None,
-                'thread_file': None,
-                'success': False,
-                'error': str(e)
-            }
+            return self._content_result(topic, None, error=str(e))
+    
+    def _resolve_thread_files(self, results: List[Dict[str, any]]):
+        """等待写文件线程完成，把结果中尚未写完的 thread_file 替换为实际的文件路径"""
+        for result in results:
+            thread_file = result.get('thread_file')
+            if isinstance(thread_file, concurrent.futures.Future):
+                try:
+                    result['thread_file'] = thread_file.result()
+                except Exception as e:
+                    print(f"❌ 保存失败: {str(e)}")
+                    result['thread_file'] = None
+    
+    @staticmethod
+    def _topic_key(topic: Dict[str, str]) -> str:
+        """选题的稳定键：优先使用 id，否则使用去除首尾空白后标题的哈希"""
+        topic_id = topic.get('id')
+        if topic_id:
+            return str(topic_id)
+        return hashlib.sha1(topic.get('title', '').strip().encode('utf-8')).hexdigest()[:16]
     
     def _merge_results(self, content_results: List[Dict[str, any]], image_results: List[Dict[str, any]]) -> List[Dict[str, any]]:
         """合并内容和图片处理结果"""
-        merged_results = []
-        
-        # 创建图片结果的索引（基于topic_title）
-        image_index = {}
-        for img_result in image_results:
-            topic_title = img_result['topic'].get('title', '')
-            image_index[topic_title] = img_result
+        # 创建图片结果的索引（两侧使用相同的稳定键）
+        image_index = {self._topic_key(img_result['topic']): img_result for img_result in image_results}
         
         # 合并结果
+        merged_results = []
         for content_result in content_results:
-            topic_title = content_result['topic'].get('title', '')
+            topic = content_result['topic']
+            content_success = content_result['success']
             
             # 查找对应的图片结果
-            image_result = image_index.get(topic_title, {})
+            image_result = image_index.get(self._topic_key(topic), {})
+            image_success = image_result.get('success', False)
             
-            merged_result = {
-                'topic': content_result['topic'],
+            merged_results.append({
+                'topic': topic,
                 'thread': content_result['thread'],
                 'thread_file': content_result['thread_file'],
-                'content_success': content_result['success'],
+                'content_success': content_success,
                 'content_error': content_result.get('error', ''),
                 'images': image_result.get('image_paths', []),
                 'image_prompt': image_result.get('prompt', ''),
-                'image_success': image_result.get('success', False),
+                'image_success': image_success,
                 'image_error': image_result.get('error', ''),
-                'overall_success': content_result['success'] and image_result.get('success', False)
-            }
-            
-            merged_results.append(merged_result)
+                'overall_success': content_success and image_success
+            })
         
         return merged_results
     
     def _save_final_results(self, results: List[Dict[str, any]], english_mode: bool) -> str:
-        """保存最终处理结果"""
+        """
+        保存最终处理结果（NDJSON 格式）
+        
+        第一行为汇总信息，之后每行一个选题的结果，逐行写入，不在内存中拼出完整的结果列表；
+        图片提示词去重后写在最后一行 {"prompts": {引用: 提示词}}，各选题的结果只记录引用
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         lang_suffix = "_english" if english_mode else "_chinese"
-        filename = f"output/concurrent_results{lang_suffix}_{timestamp}.json"
+        filename = f"output/concurrent_results{lang_suffix}_{timestamp}.jsonl"
         
         try:
-            # 确保输出目录存在
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            # 确保输出目录存在（每个目录只创建一次）
+            output_dir = os.path.dirname(filename)
+            if output_dir not in self._mkdir_cache:
+                os.makedirs(output_dir, exist_ok=True)
+                self._mkdir_cache.add(output_dir)
             
-            # 准备保存的数据
-            save_data = {
+            # 汇总信息
+            summary = {
                 'timestamp': timestamp,
                 'language_mode': 'english' if english_mode else 'chinese',
                 'total_topics': len(results),
                 'content_success_count': sum(1 for r in results if r['content_success']),
                 'image_success_count': sum(1 for r in results if r['image_success']),
                 'overall_success_count': sum(1 for r in results if r['overall_success']),
-                'total_images_generated': sum(len(r['images']) for r in results),
-                'results': []
+                'total_images_generated': sum(len(r['images']) for r in results)
             }
             
-            for result in results:
-                save_data['results'].append({
-                    'topic_title': result['topic'].get('title', ''),
-                    'topic_id': result['topic'].get('id', ''),
-                    'thread_file': result['thread_file'],
-                    'thread_count': len(result['thread']) if result['thread'] else 0,
-                    'content_success': result['content_success'],
-                    'content_error': result['content_error'],
-                    'image_count': len(result['images']),
-                    'image_paths': result['images'],
-                    'image_prompt_length': len(result['image_prompt']) if result['image_prompt'] else 0,
-                    'image_success': result['image_success'],
-                    'image_error': result['image_error'],
-                    'overall_success': result['overall_success']
-                })
+            # 相同的图片提示词只保存一次
+            prompt_pool = {}
             
-            # 保存到文件
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, ensure_ascii=False, indent=2)
+            # 逐行写入（优先使用 orjson 序列化）
+            with open(filename, 'wb', buffering=1 << 16) as f:
+                f.write(dumps_bytes(summary))
+                f.write(b"\n")
+                
+                for result in results:
+                    image_prompt = result['image_prompt']
+                    prompt_ref = None
+                    if image_prompt:
+                        prompt_ref = hashlib.blake2b(image_prompt.encode('utf-8'), digest_size=8).hexdigest()
+                        prompt_pool.setdefault(prompt_ref, image_prompt)
+                    
+                    f.write(dumps_bytes({
+                        'topic_title': result['topic'].get('title', ''),
+                        'topic_id': result['topic'].get('id', ''),
+                        'thread_file': result['thread_file'],
+                        'thread_count': len(result['thread']) if result['thread'] else 0,
+                        'content_success': result['content_success'],
+                        'content_error': result['content_error'],
+                        'image_count': len(result['images']),
+                        'image_paths': result['images'],
+                        'image_prompt_ref': prompt_ref,
+                        'image_prompt_length': len(image_prompt) if image_prompt else 0,
+                        'image_success': result['image_success'],
+                        'image_error': result['image_error'],
+                        'overall_success': result['overall_success']
+                    }))
+                    f.write(b"\n")
+                
+                f.write(dumps_bytes({'prompts': prompt_pool}))
+                f.write(b"\n")
             
             print(f"💾 最终结果已保存到: {filename}")
             return filename
@@ -303,38 +461,40 @@ class ConcurrentProcessor:
         """
         print(f"🔧 使用自定义工作流程处理 {len(topics)} 个选题")
         
-        results = []
+        # 没有选题或没有自定义处理器时直接返回
+        if not topics or not (content_processor or image_processor):
+            return []
         
-        # 如果提供了自定义处理器，使用它们
-        if content_processor or image_processor:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = []
-                
-                for topic in topics:
-                    future = executor.submit(
-                        self._process_with_custom_handlers,
-                        topic,
-                        content_processor,
-                        image_processor
-                    )
-                    futures.append((future, topic))
-                
-                # 收集结果
-                for i, (future, topic) in enumerate(futures, 1):
-                    try:
-                        result = future.result()
-                        results.append(result)
-                        topic_title = topic.get('title', '未知选题')
-                        print(f"   ✅ {i}/{len(topics)} 完成: {topic_title}")
-                    except Exception as e:
-                        topic_title = topic.get('title', '未知选题')
-                        print(f"   ❌ {i}/{len(topics)} 失败: {topic_title} - {e}")
-                        results.append({
-                            'topic': topic,
-                            'success': False,
-                            'error': str(e)
-                        })
+        # 结果按选题原顺序预先分配，完成后按下标写入
+        results = [None] * len(topics)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_idx = {
+                executor.submit(
+                    self._process_with_custom_handlers,
+                    topic,
+                    content_processor,
+                    image_processor
+                ): idx
+                for idx, topic in enumerate(topics)
+            }
+            
+            # 按完成顺序收集结果，不被先提交但耗时长的任务阻塞
+            for i, future in enumerate(concurrent.futures.as_completed(future_to_idx), 1):
+                idx = future_to_idx[future]
+                topic = topics[idx]
+                topic_title = topic.get('title', '未知选题')
+                try:
+                    results[idx] = future.result()
+                    self.log.info("   ✅ %s/%s 完成: %s", i, len(topics), topic_title)
+                except Exception as e:
+                    self.log.info("   ❌ %s/%s 失败: %s - %s", i, len(topics), topic_title, e)
+                    results[idx] = {
+                        'topic': topic,
+                        'success': False,
+                        'error': str(e)
+                    }
         
+        flush_queue_loggers()
         return results
     
     def _process_with_custom_handlers(self, 
@@ -367,10 +527,22 @@ class ConcurrentProcessor:
         """获取处理状态信息"""
         return {
             'max_workers': self.max_workers,
+            'rpm': self.rpm,
+            'concurrency_limit': self.concurrency.limit,
             'batch_generator_available': self.batch_generator is not None,
             'smart_matcher_available': self.smart_matcher is not None,
-            'templates_loaded': len(self.smart_matcher.templates) if self.smart_matcher else 0
+            'templates_loaded': self._get_template_count()
         }
+    
+    def _get_template_count(self) -> int:
+        """已加载的图片提示词模板数量（首次查询后缓存）"""
+        if self._template_count is None:
+            self._template_count = len(self.smart_matcher.templates) if self.smart_matcher else 0
+        return self._template_count
+    
+    def invalidate_template_cache(self):
+        """模板被重新加载或修改后调用，下次查询状态时重新统计模板数量"""
+        self._template_count = None
 
 
 # 创建全局并发处理器实例
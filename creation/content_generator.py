@@ -7,15 +7,70 @@
 
 import os
 import sys
+import re
 import json
+import concurrent.futures
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Set
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from core.api.tuzi_client import tuzi_client
 from core.config.config import config
+from core.prompts import build_image_prompt
+from core.utils.llm_cache import LLMCache
+from core.utils.processed_ledger import ProcessedLedger
+
+try:
+    import json5
+    JSON5_AVAILABLE = True
+except ImportError:
+    JSON5_AVAILABLE = False
+
+# 选题转文件名：去掉问号，空格换成下划线（一次 translate 完成）
+_FILENAME_TRANS = str.maketrans({'？': None, '?': None, ' ': '_'})
+
+# 同时处理的选题数上限（每个选题的请求都是阻塞的网络 IO）
+TOPIC_WORKERS = 8
+
+# 生成 Thread 使用更高的温度
+THREAD_TEMPERATURE = 0.85
+
+# 单条 Thread 的输出 token 预算，以及批量生成一次请求的输出 token 上限（不超过模型的输出限制）
+THREAD_MAX_TOKENS = 2000
+BATCH_MAX_TOKENS = 8000
+
+# 流式生成 Thread 时，出现第 4 条的编号说明前 3 条已经完整，可以提前开始生成标题
+THREAD_HEAD_MARKER = "\n4/"
+
+
+# 回复中第一个不含嵌套的 {...} 对象（标题回复是扁平的 JSON 对象）
+_JSON_OBJ = re.compile(r'\{[^{}]*\}', re.S)
+
+
+def _extract_json_object(text: str) -> Optional[Dict]:
+    """
+    从不完全是 JSON 的回复中提取 JSON 对象
+    
+    模型有时会用 ```json ... ``` 包裹回复或在前后附加说明，
+    先取出第一个 {...} 再解析，仍失败时（安装了 json5 的话）按 JSON5 宽松解析
+    
+    Returns:
+        解析出的字典，都失败时返回 None
+    """
+    match = _JSON_OBJ.search(text)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except json.JSONDecodeError:
+            pass
+    if JSON5_AVAILABLE:
+        try:
+            return json5.loads(match.group(0) if match else text)
+        except ValueError:
+            pass
+    return None
 
 
 class ContentGenerator:
@@ -28,8 +83,28 @@ class ContentGenerator:
         self.client = tuzi_client
         self.config = config
         
-        # 默认提示词模板 - 更新为thread_generator风格
-        self.thread_prompt_template = """请以「{topic}」为主题，写一条7条结构的中文X（Twitter）thread。
+        # LLM 响应缓存：相同选题/内容重复运行时直接读取本地结果（--no-cache 可关闭）
+        self.use_cache = True
+        self.cache = LLMCache(os.path.join(self.config.output_dir, '.llm_cache.sqlite'))
+        # 已处理选题索引：重复运行时跳过结果文件仍然存在的选题（同样受 --no-cache 控制）
+        self.ledger = ProcessedLedger(os.path.join(self.config.output_dir, '.processed_index.json'))
+        
+        # 与 Thread 生成并行的标题请求：每个选题线程最多同时有一个，线程数与选题线程数一致
+        self._title_executor = concurrent.futures.ThreadPoolExecutor(max_workers=TOPIC_WORKERS,
+                                                                     thread_name_prefix="title")
+        # 结果文件由单独的写入线程顺序写入，不占用标题请求的线程
+        self._write_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                                     thread_name_prefix="writer")
+        self._pending_writes = []
+        # 本次运行中已经创建过的目录，同一目录不再重复调用 os.makedirs
+        self._mkdir_cache = set()
+        
+        # 提示词模板 - 更新为thread_generator风格
+        # 固定不变的结构和风格要求全部放在 system 消息里，变化的选题/内容放在最后的 user 消息里，
+        # 每次请求的前缀完全相同，可以命中服务端的提示词缓存（prompt caching）
+        self.thread_system_prompt = """你是一个擅长写爆款 thread 的中文内容创作者，风格克制、实用、带讽刺感。
+
+请以用户给出的主题，写一条7条结构的中文X（Twitter）thread。
 
 结构要求：
 1. 每条编号用 1/, 2/, 3/ 表示；
@@ -51,16 +126,25 @@ class ContentGenerator:
 - 每条不超过220字
 - 最后输出为完整 thread 文本，一整段文本，直接用于 X 平台发帖"""
 
-        self.title_prompt_template = """请你根据下列 thread 内容，提炼一组图像封面用标题：
+        self.thread_prompt_template = "主题：「{topic}」"
+
+        self.title_system_prompt = """你是内容包装专家，负责生成社交媒体图像用标题。
 
-内容如下：
-{thread_content}
+请你根据用户给出的 thread 内容，提炼一组图像封面用标题。
 
 返回格式：
-{{
+{
   "主标题": "不超过12字，来自核心观点",
   "副标题": "不超过18字，补充说明主标题，形成张力"
-}}"""
+}"""
+
+        self.title_prompt_template = """内容如下：
+{thread_content}"""
+
+        # 每个模板只有一个占位符，初始化时按占位符切成前后两段，
+        # 生成提示词时直接拼接，不必每次调用 str.format 重新解析模板
+        self._thread_pre, self._thread_post = self.thread_prompt_template.split("{topic}", 1)
+        self._title_pre, self._title_post = self.title_prompt_template.split("{thread_content}", 1)
 
     def read_topics_from_file(self, file_path: str) -> List[str]:
         """
@@ -89,12 +173,14 @@ class ContentGenerator:
             print(f"❌ 读取选题文件失败: {e}")
             return []
 
-    def generate_thread(self, topic: str) -> Optional[str]:
+    def generate_thread(self, topic: str, on_head: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
         为指定选题生成 Thread - 返回纯文本格式
         
         Args:
             topic: 选题内容
+            on_head: 可选回调；提供时使用流式接口，前 3 条推文生成完后
+                     立即以已生成的文本调用一次（缓存命中时不调用）
             
         Returns:
             生成的 Thread 文本
@@ -102,16 +188,25 @@ class ContentGenerator:
         print(f"🔄 正在生成 Thread: {topic}")
         
         # 构建提示词
-        prompt = self.thread_prompt_template.format(topic=topic)
+        prompt = self._thread_pre + topic + self._thread_post
+        temperature = THREAD_TEMPERATURE
+        
+        cache_key = self._thread_cache_key(topic)
+        if self.use_cache:
+            cached = self.cache.get(cache_key)
+            if cached:
+                print(f"♻️ 命中缓存，长度: {len(cached)} 字符")
+                return cached
         
         # 调用 API 生成内容 - 使用更高的温度
-        response = self.client.chat_completion(
-            [
-                {"role": "system", "content": "你是一个擅长写爆款 thread 的中文内容创作者，风格克制、实用、带讽刺感。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.85
-        )
+        messages = [
+            {"role": "system", "content": self.thread_system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        if on_head is None:
+            response = self.client.chat_completion(messages, temperature=temperature)
+        else:
+            response = self._stream_thread(messages, temperature, on_head)
         
         if not response:
             print(f"❌ 生成失败: {topic}")
@@ -120,8 +215,106 @@ class ContentGenerator:
         # 返回纯文本格式，不解析JSON
         response = response.strip()
         print(f"✅ 成功生成 Thread，长度: {len(response)} 字符")
+        
+        if self.use_cache:
+            self.cache.set(cache_key, response)
         return response
 
+    def _ledger_key(self, topic: str) -> str:
+        """已处理选题索引的键：选题内容 + 当前提示词模板（模板修改后重新处理）"""
+        return ProcessedLedger.make_key(
+            topic,
+            self.thread_system_prompt, self.thread_prompt_template,
+            self.title_system_prompt, self.title_prompt_template
+        )
+
+    def _thread_cache_key(self, topic: str) -> str:
+        """单个选题 Thread 的缓存键（逐个生成和批量生成共用）"""
+        prompt = self._thread_pre + topic + self._thread_post
+        return LLMCache.make_key("thread", self.client.model, self.thread_system_prompt, prompt, THREAD_TEMPERATURE)
+
+    def generate_threads_batch(self, topics: List[str]) -> List[Optional[str]]:
+        """
+        在一次请求中为多个选题生成 Thread
+        
+        已缓存的选题直接读取，其余选题编号后合并成一个提示词，要求返回 JSON 数组；
+        只剩一个未缓存的选题或批量结果无法解析时，对应位置返回 None，
+        由调用方把这些选题作为单独的任务逐个生成
+        
+        Args:
+            topics: 选题列表（数量不超过 BATCH_MAX_TOKENS // THREAD_MAX_TOKENS）
+            
+        Returns:
+            与 topics 一一对应的 Thread 文本列表，未生成的位置为 None
+        """
+        results: List[Optional[str]] = [None] * len(topics)
+        pending = []
+        for i, topic in enumerate(topics):
+            cached = self.cache.get(self._thread_cache_key(topic)) if self.use_cache else None
+            if cached:
+                results[i] = cached
+            else:
+                pending.append(i)
+        
+        if len(topics) > len(pending):
+            print(f"♻️ {len(topics) - len(pending)} 个选题命中缓存")
+        if len(pending) <= 1:
+            return results
+        
+        print(f"🔄 正在批量生成 {len(pending)} 个 Thread")
+        numbered = "\n".join(f"{n}. {topics[i]}" for n, i in enumerate(pending, 1))
+        prompt = (f"请为以下 {len(pending)} 个主题各写一条 thread，按主题顺序返回 JSON 对象："
+                  f'{{"threads": ["第1个主题的完整 thread 文本", ...]}}\n\n{numbered}')
+        
+        response = self.client.chat_completion(
+            [
+                {"role": "system", "content": self.thread_system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=THREAD_TEMPERATURE,
+            max_tokens=min(THREAD_MAX_TOKENS * len(pending), BATCH_MAX_TOKENS),
+            response_format={"type": "json_object"}
+        )
+        
+        threads = None
+        try:
+            threads = json.loads(response).get("threads") if response else None
+        except (json.JSONDecodeError, AttributeError):
+            pass
+        
+        if (not isinstance(threads, list) or len(threads) != len(pending)
+                or not all(isinstance(t, str) and t.strip() for t in threads)):
+            print("⚠️ 批量生成结果无法解析，改为逐个生成")
+            return results
+        
+        for i, thread_text in zip(pending, threads):
+            thread_text = thread_text.strip()
+            results[i] = thread_text
+            if self.use_cache:
+                self.cache.set(self._thread_cache_key(topics[i]), thread_text)
+        
+        print(f"✅ 成功批量生成 {len(pending)} 个 Thread")
+        return results
+
+    def _stream_thread(self, messages: List[Dict], temperature: float, on_head: Callable[[str], None]) -> Optional[str]:
+        """流式生成 Thread，前 3 条完整后调用 on_head，返回完整文本"""
+        parts = []
+        head_sent = False
+        try:
+            for delta in self.client.chat_completion_stream(messages, temperature=temperature):
+                parts.append(delta)
+                if not head_sent:
+                    text = "".join(parts)
+                    pos = text.find(THREAD_HEAD_MARKER)
+                    if pos != -1:
+                        head_sent = True
+                        on_head(text[:pos])
+        except Exception as e:
+            print(f"❌ 流式生成中断: {e}")
+            return None
+        
+        return "".join(parts) or None
+
     def generate_titles(self, thread_content: str) -> Optional[Dict[str, str]]:
         """
         为 Thread 内容生成标题
@@ -134,13 +327,22 @@ class ContentGenerator:
         """
         print("🎨 正在生成封面标题...")
         
+        # 缓存键只取决于内容本身：忽略空白和大小写差异
+        normalized = " ".join(thread_content.split()).lower()
+        cache_key = LLMCache.make_key("titles", self.client.model, self.title_system_prompt, self.title_prompt_template, normalized)
+        if self.use_cache:
+            cached = self.cache.get(cache_key)
+            if cached:
+                print(f"♻️ 命中缓存: {cached['主标题']} | {cached['副标题']}")
+                return cached
+        
         # 构建提示词
-        prompt = self.title_prompt_template.format(thread_content=thread_content)
+        prompt = self._title_pre + thread_content + self._title_post
         
         # 调用 API 生成标题
         response = self.client.simple_chat(
             prompt,
-            system_prompt="你是内容包装专家，负责生成社交媒体图像用标题。"
+            system_prompt=self.title_system_prompt
         )
         
         if not response:
@@ -150,53 +352,58 @@ class ContentGenerator:
         try:
             # 解析 JSON 格式回复
             title_data = json.loads(response)
-            if isinstance(title_data, dict) and "主标题" in title_data and "副标题" in title_data:
-                print(f"✅ 成功生成标题: {title_data['主标题']} | {title_data['副标题']}")
-                return title_data
-            else:
-                print("⚠️ 标题格式不正确")
-                return None
         except json.JSONDecodeError:
-            print("⚠️ 无法解析标题 JSON 格式")
-            print(f"原始回复: {response[:200]}...")
+            # 回复带有代码块或额外说明时，在本地提取 JSON 对象，不必重新请求
+            title_data = _extract_json_object(response)
+            if title_data is None:
+                print("⚠️ 无法解析标题 JSON 格式")
+                print(f"原始回复: {response[:200]}...")
+                return None
+        
+        if isinstance(title_data, dict) and "主标题" in title_data and "副标题" in title_data:
+            print(f"✅ 成功生成标题: {title_data['主标题']} | {title_data['副标题']}")
+            if self.use_cache:
+                self.cache.set(cache_key, title_data)
+            return title_data
+        else:
+            print("⚠️ 标题格式不正确")
             return None
 
-    def save_result(self, topic: str, thread_text: str, titles: Optional[Dict[str, str]] = None, image_prompt: Optional[str] = None) -> str:
-        """
-        保存生成结果到文件 - 按thread_generator格式保存为txt
-        
-        Args:
-            topic: 选题
-            thread_text: Thread 文本内容
-            titles: 标题信息
-            image_prompt: 图片提示词
-            
-        Returns:
-            保存的文件路径
-        """
+    def _result_path(self, topic: str) -> str:
+        """确定结果文件路径（时间戳文件夹 + 安全文件名），并确保目录存在"""
         # 创建时间戳文件夹
         timestamp = datetime.now().strftime("%m%d%H%M")
         timestamp_dir = os.path.join(self.config.output_dir, timestamp)
         
-        # 确保时间戳目录存在
-        os.makedirs(timestamp_dir, exist_ok=True)
+        # 确保时间戳目录存在（每个目录只创建一次）
+        if timestamp_dir not in self._mkdir_cache:
+            os.makedirs(timestamp_dir, exist_ok=True)
+            self._mkdir_cache.add(timestamp_dir)
         
         # 安全文件名处理
-        safe_filename = topic[:30].replace('？', '').replace('?', '').replace(' ', '_')
+        safe_filename = topic[:30].translate(_FILENAME_TRANS)
         filename = f"{safe_filename}.txt"
-        filepath = os.path.join(timestamp_dir, filename)
-        
+        return os.path.join(timestamp_dir, filename)
+
+    def _write_result(self, filepath: str, topic: str, thread_text: str, titles: Optional[Dict[str, str]] = None, image_prompt: Optional[str] = None) -> str:
+        """把生成结果写入指定文件，失败时返回空字符串"""
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"🎯 选题：{topic}\n\n")
-                f.write(f"🧵 Thread：\n{thread_text}\n\n")
+            # 大段文本直接分段写入缓冲区，不再先拼接成新的格式化字符串
+            with open(filepath, 'w', encoding='utf-8', buffering=1 << 16) as f:
+                f.write("🎯 选题：")
+                f.write(topic)
+                f.write("\n\n🧵 Thread：\n")
+                f.write(thread_text)
+                f.write("\n\n")
                 
                 if titles:
                     f.write(f"📌 主标题：{titles['主标题']}\n")
                     f.write(f"📌 副标题：{titles['副标题']}\n\n")
                 
                 if image_prompt:
-                    f.write(f"🎨 图像Prompt：\n{image_prompt}\n")
+                    f.write("🎨 图像Prompt：\n")
+                    f.write(image_prompt)
+                    f.write("\n")
             
             print(f"✅ 已保存至：{filepath}")
             return filepath
@@ -205,6 +412,48 @@ class ContentGenerator:
             print(f"❌ 保存失败: {e}")
             return ""
 
+    def save_result(self, topic: str, thread_text: str, titles: Optional[Dict[str, str]] = None, image_prompt: Optional[str] = None) -> str:
+        """
+        保存生成结果到文件 - 按thread_generator格式保存为txt
+        
+        Args:
+            topic: 选题
+            thread_text: Thread 文本内容
+            titles: 标题信息
+            image_prompt: 图片提示词
+            
+        Returns:
+            保存的文件路径
+        """
+        return self._write_result(self._result_path(topic), topic, thread_text, titles, image_prompt)
+
+    def save_result_background(self, topic: str, thread_text: str, titles: Optional[Dict[str, str]] = None, image_prompt: Optional[str] = None) -> str:
+        """
+        在后台线程保存生成结果，参数同 save_result
+        
+        文件路径在当前线程确定并立即返回，写文件与下一个选题的 API 请求并行；
+        需要确认文件已写完时调用 wait_for_writes()
+        
+        Returns:
+            将要写入的文件路径
+        """
+        filepath = self._result_path(topic)
+        self._pending_writes.append(
+            self._write_executor.submit(self._write_result, filepath, topic, thread_text, titles, image_prompt)
+        )
+        return filepath
+
+    def wait_for_writes(self) -> Set[str]:
+        """
+        等待所有后台写入完成
+        
+        Returns:
+            成功写入的文件路径集合
+        """
+        pending, self._pending_writes = self._pending_writes, []
+        concurrent.futures.wait(pending)
+        return {future.result() for future in pending if future.result()}
+
     def build_image_prompt(self, title: str, subtitle: str) -> str:
         """
         构建图像生成提示词 - 按thread_generator格式
@@ -216,16 +465,15 @@ class ContentGenerator:
         Returns:
             图像提示词
         """
-        return f"""Black background, large bold yellow Chinese text: '{title}'.
-Below that in smaller white font: '{subtitle}'.
-Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable for attention-grabbing social media thumbnail."""
+        return build_image_prompt(title, subtitle)
     
-    def process_single_topic(self, topic: str) -> Dict:
+    def process_single_topic(self, topic: str, thread_text: Optional[str] = None) -> Dict:
         """
         处理单个选题的完整流程 - 按thread_generator逻辑
         
         Args:
             topic: 选题内容
+            thread_text: 已生成的 Thread 文本（例如批量生成的结果），为空时现场生成
             
         Returns:
             处理结果字典
@@ -241,20 +489,32 @@ Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable fo
         
         print(f"\n=== 🎯 正在处理选题：{topic} ===")
         
-        # 1. 生成 Thread
-        thread_text = self.generate_thread(topic)
+        # 1. 生成 Thread（流式）；前 3 条生成后就在后台开始生成标题，两个请求重叠进行
+        title_future = None
+        
+        def start_titles(head_text: str):
+            nonlocal title_future
+            title_future = self._title_executor.submit(self.generate_titles, head_text)
+        
         if not thread_text:
+            thread_text = self.generate_thread(topic, on_head=start_titles)
+        if not thread_text:
+            # Thread 生成失败：已提前提交的标题请求不再需要（尚未开始时直接取消）
+            if title_future:
+                title_future.cancel()
             return result
         
         result["thread"] = thread_text
         print("\n🧵 Thread 内容：\n", thread_text)
         
-        # 2. 生成标题
-        titles = self.generate_titles(thread_text)
+        # 2. 生成标题：提前生成的标题不可用时（或没有提前生成），用完整内容重新生成
+        titles = title_future.result() if title_future else None
+        if not titles:
+            titles = self.generate_titles(thread_text)
         if not titles or "主标题" not in titles or "副标题" not in titles:
             print("⚠️ 标题生成失败，跳过图像提示词生成")
             # 仍然保存thread
-            file_path = self.save_result(topic, thread_text, None, None)
+            file_path = self.save_result_background(topic, thread_text, None, None)
             result["file_path"] = file_path
             result["success"] = True
             return result
@@ -265,19 +525,23 @@ Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable fo
         image_prompt = self.build_image_prompt(titles["主标题"], titles["副标题"])
         result["image_prompt"] = image_prompt
         
-        # 4. 保存结果
-        file_path = self.save_result(topic, thread_text, titles, image_prompt)
+        # 4. 保存结果（后台写入，不阻塞下一个选题）
+        file_path = self.save_result_background(topic, thread_text, titles, image_prompt)
         result["file_path"] = file_path
         result["success"] = True
         
         return result
 
-    def process_all_topics(self, input_file: str = None) -> List[Dict]:
+    def process_all_topics(self, input_file: str = None,
+                           on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
         """
         处理所有选题
         
         Args:
             input_file: 输入文件路径，默认使用配置中的输入目录
+            on_result: 每个新生成的选题处理成功后立即调用，
+                       调用方可以借此在其余选题生成期间开始后续步骤（如生成图片）；
+                       跳过的已处理选题不会调用，其结果带有 skipped=True
             
         Returns:
             所有处理结果列表
@@ -294,16 +558,59 @@ Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable fo
         print(f"🚀 开始处理 {len(topics)} 个选题")
         print("=" * 50)
         
-        results = []
-        for i, topic in enumerate(topics, 1):
-            print(f"\n📝 处理第 {i}/{len(topics)} 个选题")
-            result = self.process_single_topic(topic)
-            results.append(result)
-            
-            if result["success"]:
-                print(f"✅ 处理成功: {topic}")
+        # 跳过之前已处理过的选题（相同选题 + 相同提示词模板），直接复用当时的结果
+        results: List[Optional[Dict]] = [None] * len(topics)
+        pending = []
+        for idx, topic in enumerate(topics):
+            previous = self.ledger.get(self._ledger_key(topic), "file_path") if self.use_cache else None
+            if previous:
+                # 标记为复用的结果，调用方不再为它生成图片或重复发布
+                results[idx] = dict(previous, skipped=True)
             else:
-                print(f"❌ 处理失败: {topic}")
+                pending.append(idx)
+        
+        skipped = len(topics) - len(pending)
+        if skipped:
+            print(f"⏭️ 跳过 {skipped} 个已处理的选题（使用 --no-cache 重新生成）")
+        
+        # 每批的选题数不超过输出 token 上限能容纳的 Thread 数
+        batch_size = max(1, min(self.config.thread_batch_size, BATCH_MAX_TOKENS // THREAD_MAX_TOKENS))
+        # 各选题在线程池中并发处理；提交完一批后主线程继续生成下一批的 Thread，
+        # 结果按选题顺序收集，记录和回调都在主线程中进行
+        submitted = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=TOPIC_WORKERS,
+                                                   thread_name_prefix="topic") as topic_executor:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                batch_topics = [topics[idx] for idx in batch]
+                
+                # 多个选题合并到一次请求中生成 Thread，分摊每次请求的固定开销；
+                # 没有拿到 Thread 的选题（None）提交后在工作线程中单独流式生成
+                threads = self.generate_threads_batch(batch_topics) if batch_size > 1 else [None] * len(batch)
+                
+                for idx, topic, thread_text in zip(batch, batch_topics, threads):
+                    future = topic_executor.submit(self.process_single_topic, topic, thread_text)
+                    submitted.append((idx, topic, future))
+            
+            for idx, topic, future in submitted:
+                print(f"\n📝 处理第 {idx + 1}/{len(topics)} 个选题")
+                result = future.result()
+                results[idx] = result
+                
+                if result["success"]:
+                    print(f"✅ 处理成功: {topic}")
+                    if on_result:
+                        on_result(result)
+                else:
+                    print(f"❌ 处理失败: {topic}")
+        
+        # 确保所有结果文件都已写入；只有文件写入成功的选题才记入索引，下次运行时跳过
+        written = self.wait_for_writes()
+        self.ledger.record_many({
+            self._ledger_key(topics[idx]): results[idx]
+            for idx in pending
+            if results[idx]["success"] and results[idx]["file_path"] in written
+        })
         
         # 统计结果
         successful = [r for r in results if r["success"]]
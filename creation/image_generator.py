@@ -8,15 +8,181 @@
 import os
 import sys
 import json
+import re
+import mmap
+import time
 import requests
 import base64
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
+from pathlib import Path
 from typing import List, Dict, Optional
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from core.config.config import config
+from core.prompts import build_image_prompt
+
+try:
+    # SIMD 加速的 base64 解码，图片数据通常有数 MB
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
+
+# 纯 base64 内容的前缀检查：只检查开头的 1000 个字符，不是 base64 的内容（如普通文本回复）直接跳过解码
+_B64_PREFIX_RE = re.compile(r'[A-Za-z0-9+/=\s]{1000}')
+
+# 分段解码的块大小（字符数），必须是 4 的倍数，保证每段都是完整的 base64 分组
+B64_CHUNK_SIZE = 64 * 1024
+
+
+def _extract_b64(content: str) -> Optional[str]:
+    """
+    从返回内容中取出 base64 图片数据
+    
+    Returns:
+        data URI 去掉头部后的数据，或疑似纯 base64 的内容；普通文本返回 None
+    """
+    if content.startswith('data:image'):
+        return content.split(',', 1)[1] if ',' in content else None
+    if len(content) > 1000 and _B64_PREFIX_RE.match(content):
+        return content
+    return None
+
+
+def _iov_max() -> int:
+    """单次 writev 允许的最大缓冲区数量"""
+    try:
+        return max(1, os.sysconf('SC_IOV_MAX'))
+    except (AttributeError, ValueError, OSError):
+        return 1024
+
+
+def _b64decode(data: str) -> bytes:
+    """解码 base64 图片数据，优先使用 pybase64"""
+    if PYBASE64_AVAILABLE:
+        return pybase64.b64decode(data, validate=False)
+    return base64.b64decode(data)
+
+
+# 同一秒内生成的文件共用格式化好的时间戳：(秒数, 时间戳字符串)
+_timestamp_cache = (0, "")
+
+
+def _file_timestamp() -> str:
+    """文件名用的时间戳（%Y%m%d_%H%M%S），同一秒内只格式化一次"""
+    global _timestamp_cache
+    now = int(time.time())
+    if _timestamp_cache[0] != now:
+        _timestamp_cache = (now, datetime.fromtimestamp(now).strftime("%Y%m%d_%H%M%S"))
+    return _timestamp_cache[1]
+
+
+def _safe_topic(topic: str) -> str:
+    """文件名中使用的选题片段"""
+    return topic[:20].replace('/', '_')
+
+
+def _b64_decoded_length(encoded: str) -> int:
+    """根据 base64 字符串长度和末尾的填充计算解码后的字节数"""
+    return 3 * (len(encoded) // 4) - encoded.count('=', len(encoded) - 2)
+
+
+def _write_b64_file(encoded: str, filepath: str) -> bool:
+    """
+    把 base64 数据分段解码，直接写入内存映射的文件
+    
+    先按解码后的长度设置文件大小并映射到内存，每次只解码 64KB 写入映射区域：
+    内存中不会同时存在完整的编码字符串和完整的解码结果，也不经过文件缓冲区的额外拷贝
+    
+    Returns:
+        是否写入成功；解码失败时删除写了一半的文件
+    """
+    if any(c in encoded for c in '\r\n '):
+        # 带换行或空格的数据无法按固定长度对齐分组，先去掉空白
+        encoded = ''.join(encoded.split())
+    
+    if len(encoded) % 4:
+        # 长度不是 4 的倍数，不是完整的 base64 数据
+        return False
+    
+    size = _b64_decoded_length(encoded)
+    if size <= 0:
+        return False
+    
+    try:
+        with open(filepath, 'wb+') as f:
+            f.truncate(size)
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_WRITE) as mm:
+                pos = 0
+                for start in range(0, len(encoded), B64_CHUNK_SIZE):
+                    chunk = _b64decode(encoded[start:start + B64_CHUNK_SIZE])
+                    end = pos + len(chunk)
+                    if end > size:
+                        raise ValueError("base64 数据长度与预期不符")
+                    mm[pos:end] = chunk
+                    pos = end
+                mm.flush()
+            if pos != size:
+                # 数据中夹带的非法字符被解码器忽略，实际长度比预期短
+                f.truncate(pos)
+        return True
+    except (ValueError, TypeError):
+        # base64 数据无效（binascii.Error 是 ValueError 的子类）
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return False
+
+
+def _write_b64_fragments(fragments: List[str], filepath: str) -> bool:
+    """
+    把分段返回的 base64 数据逐段解码，用 os.writev 写入文件
+    
+    每段按与字符串内容相同的规则检查（data URI 或纯 base64），普通文本段直接跳过。
+    各段解码结果作为缓冲区向量直接交给 writev，不在用户态拼接成一个大字节串，
+    每次最多提交 IOV_MAX 个缓冲区。某段长度不是 4 的倍数（分组跨段）或平台没有 writev（Windows）时，
+    先拼接成完整字符串再交给 _write_b64_file
+    
+    Returns:
+        是否写入成功；写入失败时删除写了一半的文件
+    """
+    fragments = [_extract_b64(frag) for frag in fragments]
+    fragments = [''.join(frag.split()) for frag in fragments if frag]
+    if not fragments:
+        return False
+    if not hasattr(os, 'writev') or any(len(frag) % 4 for frag in fragments):
+        return _write_b64_file(''.join(fragments), filepath)
+    
+    try:
+        buffers = [_b64decode(frag) for frag in fragments]
+    except (ValueError, TypeError):
+        return False
+    
+    iov_max = _iov_max()
+    try:
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            for start in range(0, len(buffers), iov_max):
+                group = buffers[start:start + iov_max]
+                total = sum(len(buf) for buf in group)
+                written = os.writev(fd, group)
+                if written < total:
+                    # 少见的部分写入：本组剩余数据按普通方式补写
+                    rest = memoryview(b''.join(group))[written:]
+                    while rest:
+                        rest = rest[os.write(fd, rest):]
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"❌ 图片写入失败: {e}")
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return False
+    return True
 
 
 class ImageGenerator:
@@ -34,6 +200,8 @@ class ImageGenerator:
         self.model = image_config['model']
         self.image_count = image_config['count']
         self.enabled = image_config['enabled']
+        # 输出目录的 Path 对象只创建一次，保存文件时直接拼接文件名
+        self.output_path = Path(self.config.output_dir)
         
         if not self.enabled:
             print("⚠️ 图片生成功能已禁用")
@@ -49,6 +217,20 @@ class ImageGenerator:
             'Content-Type': 'application/json'
         }
         
+        # 复用同一个 Session 保持 keep-alive 连接，避免每张图片都重新进行 TCP + TLS 握手
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # 只重试连接失败和幂等请求的 5xx：POST 重发会重复计费一次生成，
+        # 429 交给调用方处理，限流统计和熔断器才能看到
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[500, 502, 503, 504]
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry_strategy)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
         print(f"🎨 图片生成配置:")
         print(f"   API URL: {self.api_url}")
         print(f"   Model: {self.model}")
@@ -70,11 +252,7 @@ class ImageGenerator:
         Returns:
             图片生成提示词
         """
-        prompt = f"""Black background, large bold yellow Chinese text: '{main_title}'.
-Below that in smaller white font: '{subtitle}'.
-Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable for attention-grabbing social media thumbnail."""
-        
-        return prompt
+        return build_image_prompt(main_title, subtitle)
 
     def generate_image(self, prompt: str, topic: str = "") -> Optional[List[str]]:
         """
@@ -108,9 +286,8 @@ Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable fo
                 "n": self.image_count
             }
             
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
-                headers=self.headers,
                 json=payload,
                 timeout=120  # 图片生成可能需要更长时间
             )
@@ -129,34 +306,36 @@ Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable fo
             
             # 保存图片
             image_paths = []
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # 文件名前缀在循环外拼好，每张图片只追加序号
+            file_prefix = f"image_{_file_timestamp()}_{_safe_topic(topic)}_"
             
             for i, choice in enumerate(result['choices']):
                 # 根据不同的返回格式处理
-                image_data = None
+                encoded = None
+                fragments = None
+                
+                # 检查是否有图片数据（缺少字段或内容不是字符串时视为无数据）
+                content = (choice.get('message') or {}).get('content')
+                if isinstance(content, list):
+                    # 分段返回的内容：每段是字符串或 {"text": ...}
+                    fragments = [part if isinstance(part, str) else part.get('text') or ''
+                                 for part in content if isinstance(part, (str, dict))]
+                    if not any(fragments):
+                        fragments = None
+                elif isinstance(content, str):
+                    # 如果内容是 base64 图片数据（data URI 或纯 base64）
+                    encoded = _extract_b64(content)
                 
-                # 检查是否有图片数据
-                if 'message' in choice and 'content' in choice['message']:
-                    content = choice['message']['content']
-                    # 如果内容是 base64 图片数据
-                    if content.startswith('data:image'):
-                        # 提取 base64 数据
-                        header, encoded = content.split(',', 1)
-                        image_data = base64.b64decode(encoded)
-                    elif len(content) > 1000:  # 可能是 base64 数据
-                        try:
-                            image_data = base64.b64decode(content)
-                        except:
-                            pass
+                # 保存图片文件（边解码边写入）
+                filename = f"{file_prefix}{i+1}.png"
+                filepath = os.fspath(self.output_path / filename)
                 
-                if image_data:
-                    # 保存图片文件
-                    filename = f"image_{timestamp}_{topic[:20].replace('/', '_')}_{i+1}.png"
-                    filepath = os.path.join(self.config.output_dir, filename)
-                    
-                    with open(filepath, 'wb') as f:
-                        f.write(image_data)
-                    
+                if fragments:
+                    saved = _write_b64_fragments(fragments, filepath)
+                else:
+                    saved = bool(encoded) and _write_b64_file(encoded, filepath)
+                
+                if saved:
                     image_paths.append(filepath)
                     print(f"✅ 图片已保存: {filename}")
                 else:
@@ -227,18 +406,26 @@ Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable fo
         Returns:
             保存的文件路径
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"image_prompt_{timestamp}_{topic[:20].replace('/', '_')}.txt"
-        filepath = os.path.join(self.config.output_dir, filename)
+        timestamp = _file_timestamp()
+        filename = f"image_prompt_{timestamp}_{_safe_topic(topic)}.txt"
+        filepath = os.fspath(self.output_path / filename)
+        
+        # 拼成一个字符串后只编码一次，用一次 os.write 写入
+        payload = (f"选题: {topic}\n"
+                   f"主标题: {main_title}\n"
+                   f"副标题: {subtitle}\n"
+                   f"生成时间: {timestamp}\n"
+                   + "=" * 50 + "\n"
+                   f"图片提示词:\n{prompt}\n")
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"选题: {topic}\n")
-                f.write(f"主标题: {main_title}\n")
-                f.write(f"副标题: {subtitle}\n")
-                f.write(f"生成时间: {timestamp}\n")
-                f.write("=" * 50 + "\n")
-                f.write(f"图片提示词:\n{prompt}\n")
+            data = memoryview(payload.encode('utf-8'))
+            fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                while data:
+                    data = data[os.write(fd, data):]
+            finally:
+                os.close(fd)
             
             print(f"✅ 提示词已保存: {filename}")
             return filepath
@@ -8,6 +8,8 @@ Tweet 内容生成工具
 import os
 import sys
 import argparse
+import concurrent.futures
+from pathlib import Path
 from typing import List, Dict
 
 # 添加项目根目录到路径
@@ -16,7 +18,17 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from core.config.config import config
 from creation.content_generator import content_generator
 from creation.image_generator import image_generator
-from publishing.publisher import publisher
+from publishing.publisher import get_publisher
+
+try:
+    # 流式解析结果文件，预览时只取需要的几个字段
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# 与内容生成并行的图片生成线程数
+IMAGE_WORKERS = 4
 
 
 def process_topics_workflow(input_file: str = None, enable_images: bool = True, enable_publishing: bool = False) -> List[Dict]:
@@ -39,8 +51,8 @@ def process_topics_workflow(input_file: str = None, enable_images: bool = True,
         return []
     
     # 设置默认输入文件
-    if not input_file:
-        input_file = os.path.join(config.input_dir, "topics.txt")
+    input_path = Path(input_file) if input_file else config.default_topics_path
+    input_file = os.fspath(input_path)
     
     print(f"📋 工作流程配置:")
     print(f"   输入文件: {input_file}")
@@ -49,14 +61,38 @@ def process_topics_workflow(input_file: str = None, enable_images: bool = True,
     print("=" * 60)
     
     # 检查输入文件
-    if not os.path.exists(input_file):
+    if not input_path.is_file():
         print(f"❌ 输入文件不存在: {input_file}")
         print("💡 请在 input/ 目录下创建 topics.txt 文件并添加选题内容")
         return []
     
-    # 1. 生成内容
+    images_available = enable_images and image_generator and image_generator.is_available()
+    
+    # 1. 生成内容；每个选题的标题一生成就提交图片生成任务，与其余选题的内容生成并行进行
     print("\n📝 步骤 1: 生成 Tweet 内容")
-    results = content_generator.process_all_topics(input_file)
+    image_executor = concurrent.futures.ThreadPoolExecutor(max_workers=IMAGE_WORKERS) if images_available else None
+    image_futures = []
+    
+    def _submit_cover(result: Dict):
+        if result["titles"]:
+            topic = result["topic"]
+            print(f"🎨 为选题生成图片: {topic}")
+            future = image_executor.submit(
+                image_generator.generate_cover_image,
+                result["titles"]["主标题"],
+                result["titles"]["副标题"],
+                topic
+            )
+            image_futures.append((result, future))
+    
+    on_result = _submit_cover if images_available else None
+    
+    try:
+        results = content_generator.process_all_topics(input_file, on_result=on_result)
+    finally:
+        if image_executor:
+            # 不再提交新任务；已提交的任务在下面逐个等待结果
+            image_executor.shutdown(wait=False)
     
     if not results:
         print("❌ 没有成功处理任何选题")
@@ -64,35 +100,41 @@ def process_topics_workflow(input_file: str = None, enable_images: bool = True,
     
     successful_results = [r for r in results if r["success"]]
     print(f"✅ 内容生成完成: {len(successful_results)}/{len(results)}")
+    # 之前运行已处理过的选题（skipped）已经生成过图片和发布过，不再重复
+    new_results = [r for r in successful_results if not r.get("skipped")]
+    
+    # 图片和发布的成功数在各自的循环中累计，统计时不再重新遍历结果
+    successful_images = 0
+    successful_publish = 0
     
-    # 2. 生成图片（如果启用）
-    if enable_images and image_generator and image_generator.is_available():
+    # 2. 等待图片生成完成（如果启用）
+    if images_available:
         print("\n🎨 步骤 2: 生成封面图片")
         
-        for result in successful_results:
-            if result["titles"]:
-                main_title = result["titles"]["主标题"]
-                subtitle = result["titles"]["副标题"]
-                topic = result["topic"]
-                
-                print(f"🎨 为选题生成图片: {topic}")
-                image_path = image_generator.generate_cover_image(main_title, subtitle, topic)
-                
-                if image_path:
-                    result["cover_image"] = image_path
-                    print(f"✅ 图片生成成功")
-                else:
-                    print(f"⚠️ 图片生成失败")
+        for result, future in image_futures:
+            try:
+                image_path = future.result()
+            except Exception as e:
+                print(f"❌ 图片生成异常: {e}")
+                image_path = None
+            
+            if image_path:
+                result["cover_image"] = image_path
+                successful_images += 1
+                print(f"✅ 图片生成成功: {result['topic']}")
+            else:
+                print(f"⚠️ 图片生成失败: {result['topic']}")
     elif enable_images:
         print("\n⚠️ 图片生成功能不可用，跳过图片生成")
     else:
         print("\n⏭️ 跳过图片生成")
     
     # 3. 发布内容（如果启用）
-    if enable_publishing and publisher and publisher.is_available():
+    publisher = get_publisher() if enable_publishing else None
+    if publisher and publisher.is_available():
         print("\n📤 步骤 3: 发布内容")
         
-        for result in successful_results:
+        for result in new_results:
             if result["thread"]:
                 topic = result["topic"]
                 thread = result["thread"]
@@ -103,6 +145,7 @@ def process_topics_workflow(input_file: str = None, enable_images: bool = True,
                 
                 result["published"] = success
                 if success:
+                    successful_publish += 1
                     print(f"✅ 发布成功")
                 else:
                     print(f"❌ 发布失败")
@@ -117,8 +160,6 @@ def process_topics_workflow(input_file: str = None, enable_images: bool = True,
     
     total_topics = len(results)
     successful_content = len(successful_results)
-    successful_images = len([r for r in successful_results if r.get("cover_image")])
-    successful_publish = len([r for r in successful_results if r.get("published")])
     
     print(f"总选题数量: {total_topics}")
     print(f"内容生成成功: {successful_content}")
@@ -135,6 +176,38 @@ def process_topics_workflow(input_file: str = None, enable_images: bool = True,
     return results
 
 
+PREVIEW_FIELDS = ("topic", "timestamp", "thread_count")
+
+
+def _read_result_summary(file_path: str) -> Dict:
+    """
+    读取结果文件中预览需要的顶层字段
+    
+    安装了 ijson 时按事件流式解析，三个字段都找到后立即停止，
+    不会把整个结果（包括完整的推文内容）解析成 Python 对象；未安装时回退到 json.load
+    
+    Args:
+        file_path: 结果文件路径
+        
+    Returns:
+        只包含预览字段的字典（缺少的字段不出现）
+    """
+    if not IJSON_AVAILABLE:
+        import json
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {key: data[key] for key in PREVIEW_FIELDS if key in data}
+    
+    summary = {}
+    with open(file_path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix in PREVIEW_FIELDS and event in ('string', 'number'):
+                summary[prefix] = value
+                if len(summary) == len(PREVIEW_FIELDS):
+                    break
+    return summary
+
+
 def preview_recent_results(count: int = 5) -> None:
     """
     预览最近的生成结果
@@ -146,9 +219,7 @@ def preview_recent_results(count: int = 5) -> None:
     print("=" * 60)
     
     try:
-        import json
         import glob
-        from datetime import datetime
         
         # 查找所有结果文件
         pattern = os.path.join(config.output_dir, "tweet_content_*.json")
@@ -163,8 +234,7 @@ def preview_recent_results(count: int = 5) -> None:
         
         for i, file_path in enumerate(files[:count], 1):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = _read_result_summary(file_path)
                 
                 filename = os.path.basename(file_path)
                 topic = data.get("topic", "未知选题")
@@ -218,6 +288,7 @@ def test_components() -> None:
     
     # 测试发布器
     print("\n4. 发布器测试:")
+    publisher = get_publisher()
     if publisher:
         if publisher.is_available():
             print("   ✅ 发布器可用")
@@ -243,6 +314,7 @@ def main():
   python main.py --input topics.txt       # 指定输入文件
   python main.py --test                   # 测试各组件
   python main.py --preview                # 预览最近结果
+  python main.py --no-cache               # 忽略缓存，重新生成内容
         """
     )
     
@@ -253,6 +325,7 @@ def main():
     parser.add_argument("--test", action="store_true", help="测试各个组件")
     parser.add_argument("--preview", action="store_true", help="预览最近的生成结果")
     parser.add_argument("--count", type=int, default=5, help="预览结果数量（默认5个）")
+    parser.add_argument("--no-cache", action="store_true", help="不使用 LLM 响应缓存，重新调用 API 生成")
     
     args = parser.parse_args()
     
@@ -264,6 +337,9 @@ def main():
         preview_recent_results(args.count)
         return
     
+    if args.no_cache and content_generator:
+        content_generator.use_cache = False
+    
     # 确定启用的功能
     enable_images = args.enable_images or args.enable_all
     enable_publishing = args.enable_publishing or args.enable_all
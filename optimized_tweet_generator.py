@@ -8,15 +8,83 @@ import json
 import os
 import sys
 import re
+import ast
 import time
-import inspect
+import asyncio
+import logging
+import threading
 from typing import List, Dict, Optional
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(__file__))
 
 from core.gpt.gpt_client import gpt_client
-from core.utils.logger import setup_logging, cleanup_logging
+from core.utils.logger import setup_logging, cleanup_logging, get_console_logger
+from core.utils.topics_file import read_topic_lines
+from core.prompts import build_image_prompt
+from core.utils.json_io import dump_file, loads as json_loads
+from core.utils.llm_cache import LLMCache
+
+# 异步并发处理话题时，同时进行的话题数上限
+MAX_CONCURRENT_TOPICS = 8
+
+THREAD_SYSTEM_PROMPT = "你是一个擅长写搞钱 thread 的中文社交媒体内容创作者。"
+TITLE_SYSTEM_PROMPT = "你是内容包装专家，负责生成社交媒体图像用标题。"
+
+# 标题数据必须包含的字段
+_TITLE_KEYS = frozenset(("主标题", "副标题"))
+
+# Thread 和标题提示词的固定部分在模块加载时拆成前后两段，每次调用只拼接变量部分
+_THREAD_PROMPT_PREFIX = """
+请以「"""
+_THREAD_PROMPT_SUFFIX = """」为主题，写一条7条结构的中文X（Twitter）thread。
+
+结构要求：
+1. 第1条是钩子，带有反常识洞察；
+2. 第2-4条拆解真实路径或案例；
+3. 第5-6条指出常见误区；
+4. 第7条是一句总结建议，鼓励收藏或评论。
+
+风格要求：
+- 不喊口号，不空谈方法论，语言具体有画面感；
+- 适度讽刺、冷静现实；
+- 每条 140~220 字，用短句断行；
+- 用 JSON 格式输出，如：
+[
+  {"tweet": "第1条内容"},
+  ...
+]
+"""
+
+_TITLE_PROMPT_PREFIX = """
+请你根据下列 thread 内容，提炼一组图像封面用标题：
+
+内容如下：
+"""
+_TITLE_PROMPT_SUFFIX = """
+
+返回格式：
+{
+  "主标题": "不超过12字，来自核心观点",
+  "副标题": "不超过18字，补充说明主标题，形成张力"
+}
+"""
+
+# 调试日志格式：[级别] 文件名:行号 - 消息
+DEBUG_LOG_FORMAT = '[%(levelname)s] %(filename)s:%(lineno)d - %(message)s'
+
+# debug_log 的级别名称到 logging 级别的映射
+LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+# markdown 代码块标记：开始标记 ```json（连同后面的空白）和单独一行的结束标记 ```，一次替换全部去掉
+_RE_JSON_FENCE = re.compile(r'^```(?:json\s*|\s*$)', re.MULTILINE)
+# 对象或数组结尾前多余的逗号
+_RE_TRAILING_COMMA = re.compile(r',\s*([}\]])')
 
 
 class ThreadGenerator:
@@ -28,28 +96,38 @@ class ThreadGenerator:
         self.gpt = gpt_client
         self.total_tokens = 0
         self.request_count = 0
+        # 多个话题在线程池中并发处理时保护请求计数
+        self._count_lock = threading.Lock()
+        # 相同提示词的请求直接读取本地缓存（重复选题、失败后重跑）
+        os.makedirs("output", exist_ok=True)
+        self.cache = LLMCache(os.path.join("output", ".llm_cache.sqlite"))
+        # 调试输出的级别可以通过 LOG_LEVEL 环境变量调高（如 INFO），低于该级别的日志不会格式化参数
+        log_level = LOG_LEVELS.get(os.getenv('LOG_LEVEL', 'DEBUG').upper(), logging.DEBUG)
+        self._logger = get_console_logger(__name__, DEBUG_LOG_FORMAT, log_level)
         
     def debug_log(self, message: str, level: str = "DEBUG"):
-        """调试日志，包含文件位置信息"""
-        frame = inspect.currentframe().f_back
-        filename = os.path.basename(frame.f_filename)
-        line_number = frame.f_lineno
-        print(f"[{level}] {filename}:{line_number} - {message}")
+        """
+        调试日志，包含文件位置信息（由 logging 记录调用者的位置，stacklevel=2 指向 debug_log 的调用方）
+        
+        DEBUG 级别的日志直接调用 self._logger.debug 并用 %s 传参，级别未开启时不会拼接字符串
+        """
+        self._logger.log(LOG_LEVELS.get(level, logging.DEBUG), message, stacklevel=2)
         
     def log_token_usage(self, usage_info: str):
         """记录token使用情况"""
-        self.request_count += 1
+        with self._count_lock:
+            self.request_count += 1
+            count = self.request_count
         # 这里可以根据实际API返回的token信息进行统计
-        self.debug_log(f"请求#{self.request_count} - {usage_info}")
-        self.debug_log(f"总请求数: {self.request_count}, 累计tokens: {self.total_tokens}")
+        self._logger.debug("请求#%s - %s", count, usage_info)
+        self._logger.debug("总请求数: %s, 累计tokens: %s", count, self.total_tokens)
         
     def read_topics(self, file_path: str = "input/topics.txt") -> List[str]:
         """读取话题列表"""
-        self.debug_log(f"开始读取话题文件: {file_path}")
+        self._logger.debug("开始读取话题文件: %s", file_path)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                topics = [line.strip() for line in f if line.strip()]
-            self.debug_log(f"成功读取 {len(topics)} 个话题")
+            topics = read_topic_lines(file_path)
+            self._logger.debug("成功读取 %s 个话题", len(topics))
             return topics
         except FileNotFoundError:
             self.debug_log(f"话题文件 {file_path} 不存在", "ERROR")
@@ -60,147 +138,202 @@ class ThreadGenerator:
 
     def build_thread_prompt(self, topic: str) -> str:
         """构建Thread生成提示词"""
-        return f"""
-请以「{topic}」为主题，写一条7条结构的中文X（Twitter）thread。
-
-结构要求：
-1. 第1条是钩子，带有反常识洞察；
-2. 第2-4条拆解真实路径或案例；
-3. 第5-6条指出常见误区；
-4. 第7条是一句总结建议，鼓励收藏或评论。
-
-风格要求：
-- 不喊口号，不空谈方法论，语言具体有画面感；
-- 适度讽刺、冷静现实；
-- 每条 140~220 字，用短句断行；
-- 用 JSON 格式输出，如：
-[
-  {{"tweet": "第1条内容"}},
-  ...
-]
-"""
+        return _THREAD_PROMPT_PREFIX + topic + _THREAD_PROMPT_SUFFIX
 
     def build_title_prompt(self, thread_text: str) -> str:
         """构建标题提取提示词"""
-        return f"""
-请你根据下列 thread 内容，提炼一组图像封面用标题：
-
-内容如下：
-{thread_text}
-
-返回格式：
-{{
-  "主标题": "不超过12字，来自核心观点",
-  "副标题": "不超过18字，补充说明主标题，形成张力"
-}}
-"""
+        return _TITLE_PROMPT_PREFIX + thread_text + _TITLE_PROMPT_SUFFIX
 
     def build_image_prompt(self, title: str, subtitle: str) -> str:
         """构建图像生成提示词"""
-        return f"""Black background, large bold yellow Chinese text: '{title}'.
-Below that in smaller white font: '{subtitle}'.
-Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable for attention-grabbing social media thumbnail."""
+        return build_image_prompt(title, subtitle)
+
+    def _cache_key(self, prompt: str, system_prompt: str) -> str:
+        """请求的缓存键：模型 + 系统提示词 + 用户提示词（simple_chat 使用默认温度）"""
+        return LLMCache.make_key(self.gpt.model, system_prompt, prompt)
+
+    def _chat(self, prompt: str, system_prompt: str) -> Optional[str]:
+        """调用 GPT，命中缓存时不发送请求"""
+        key = self._cache_key(prompt, system_prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._logger.debug("命中缓存，跳过API调用")
+            return cached
+        result = self.gpt.simple_chat(prompt, system_prompt)
+        if result:
+            self.cache.set(key, result)
+        return result
+
+    async def _achat(self, prompt: str, system_prompt: str) -> Optional[str]:
+        """调用 GPT（异步版本），命中缓存时不发送请求"""
+        key = self._cache_key(prompt, system_prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._logger.debug("命中缓存，跳过API调用")
+            return cached
+        result = await self.gpt.asimple_chat(prompt, system_prompt)
+        if result:
+            self.cache.set(key, result)
+        return result
 
     def generate_thread(self, topic: str) -> Optional[str]:
         """生成Thread内容"""
-        self.debug_log(f"开始生成Thread，话题: {topic}")
+        self._logger.debug("开始生成Thread，话题: %s", topic)
         try:
-            system_prompt = "你是一个擅长写搞钱 thread 的中文社交媒体内容创作者。"
-            user_prompt = self.build_thread_prompt(topic)
-            
             start_time = time.time()
-            result = self.gpt.simple_chat(user_prompt, system_prompt)
-            end_time = time.time()
+            result = self._chat(self.build_thread_prompt(topic), THREAD_SYSTEM_PROMPT)
+            return self._check_thread(topic, result, time.time() - start_time)
             
-            self.log_token_usage(f"Thread生成 - 耗时: {end_time-start_time:.2f}s")
-            
-            if result:
-                self.debug_log(f"成功生成话题「{topic}」的Thread，长度: {len(result)}字符")
-                self.debug_log(f"原始回复前100字符: {result[:100]}...")
-            else:
-                self.debug_log(f"生成话题「{topic}」的Thread失败", "ERROR")
-                
-            return result
+        except Exception as e:
+            self.debug_log(f"生成Thread时出错: {e}", "ERROR")
+            return None
+
+    async def agenerate_thread(self, topic: str) -> Optional[str]:
+        """生成Thread内容（异步版本）"""
+        self._logger.debug("开始生成Thread，话题: %s", topic)
+        try:
+            start_time = time.time()
+            result = await self._achat(self.build_thread_prompt(topic), THREAD_SYSTEM_PROMPT)
+            return self._check_thread(topic, result, time.time() - start_time)
             
         except Exception as e:
             self.debug_log(f"生成Thread时出错: {e}", "ERROR")
             return None
 
+    def _check_thread(self, topic: str, result: Optional[str], elapsed: float) -> Optional[str]:
+        """记录Thread生成的耗时和结果"""
+        self.log_token_usage(f"Thread生成 - 耗时: {elapsed:.2f}s")
+        
+        if result:
+            self._logger.debug("成功生成话题「%s」的Thread，长度: %s字符", topic, len(result))
+            self._logger.debug("原始回复前100字符: %.100s...", result)
+        else:
+            self.debug_log(f"生成话题「{topic}」的Thread失败", "ERROR")
+            
+        return result
+
     def clean_json_response(self, response: str) -> str:
         """清理GPT回复中的markdown格式，提取纯JSON"""
-        self.debug_log(f"开始清理JSON回复，原始长度: {len(response)}")
+        self._logger.debug("开始清理JSON回复，原始长度: %s", len(response))
         
-        # 移除markdown代码块标记
-        response = re.sub(r'^```json\s*', '', response, flags=re.MULTILINE)
-        response = re.sub(r'^```\s*$', '', response, flags=re.MULTILINE)
+        # 移除markdown代码块标记（没有代码块时跳过正则替换）
+        if '```' in response:
+            response = _RE_JSON_FENCE.sub('', response)
         response = response.strip()
         
-        self.debug_log(f"清理后长度: {len(response)}")
-        self.debug_log(f"清理后前100字符: {response[:100]}")
+        self._logger.debug("清理后长度: %s", len(response))
+        self._logger.debug("清理后前100字符: %.100s", response)
         
         return response
     
     def extract_title_from_thread(self, thread_text: str) -> Optional[Dict[str, str]]:
         """从Thread中提取标题"""
-        self.debug_log("开始提取标题")
+        self._logger.debug("开始提取标题")
         try:
-            system_prompt = "你是内容包装专家，负责生成社交媒体图像用标题。"
-            user_prompt = self.build_title_prompt(thread_text)
-            
             start_time = time.time()
-            result = self.gpt.simple_chat(user_prompt, system_prompt)
-            end_time = time.time()
-            
-            self.log_token_usage(f"标题提取 - 耗时: {end_time-start_time:.2f}s")
-            
-            if result:
-                self.debug_log(f"获得标题回复，长度: {len(result)}字符")
-                
-                # 清理回复格式
-                cleaned_result = self.clean_json_response(result)
+            result = self._chat(self.build_title_prompt(thread_text), TITLE_SYSTEM_PROMPT)
+            return self._parse_title_result(result, time.time() - start_time)
                 
-                # 安全解析JSON
-                try:
-                    title_data = json.loads(cleaned_result)
-                    self.debug_log("成功解析标题JSON")
-                    return title_data
-                except json.JSONDecodeError as e:
-                    self.debug_log(f"JSON解析失败: {e}", "ERROR")
-                    self.debug_log(f"尝试解析的内容: {cleaned_result[:200]}", "ERROR")
-                    
-                    # 如果JSON解析失败，尝试使用eval（不推荐，但作为fallback）
-                    try:
-                        title_data = eval(cleaned_result)
-                        self.debug_log("使用eval解析标题数据", "WARNING")
-                        return title_data
-                    except Exception as eval_e:
-                        self.debug_log(f"eval解析也失败: {eval_e}", "ERROR")
-                        return None
-            else:
-                self.debug_log("标题提取失败", "ERROR")
-                return None
+        except Exception as e:
+            self.debug_log(f"提取标题时出错: {e}", "ERROR")
+            return None
+
+    async def aextract_title_from_thread(self, thread_text: str) -> Optional[Dict[str, str]]:
+        """从Thread中提取标题（异步版本）"""
+        self._logger.debug("开始提取标题")
+        try:
+            start_time = time.time()
+            result = await self._achat(self.build_title_prompt(thread_text), TITLE_SYSTEM_PROMPT)
+            return self._parse_title_result(result, time.time() - start_time)
                 
         except Exception as e:
             self.debug_log(f"提取标题时出错: {e}", "ERROR")
             return None
 
+    def _parse_title_result(self, result: Optional[str], elapsed: float) -> Optional[Dict[str, str]]:
+        """记录标题提取的耗时，并解析标题回复"""
+        self.log_token_usage(f"标题提取 - 耗时: {elapsed:.2f}s")
+        
+        if not result:
+            self.debug_log("标题提取失败", "ERROR")
+            return None
+        
+        self._logger.debug("获得标题回复，长度: %s字符", len(result))
+        
+        # 清理回复格式
+        cleaned_result = self.clean_json_response(result)
+        
+        # 安全解析JSON
+        try:
+            title_data = json_loads(cleaned_result)
+            self._logger.debug("成功解析标题JSON")
+            return title_data
+        except json.JSONDecodeError as e:
+            self.debug_log(f"JSON解析失败: {e}", "ERROR")
+            self.debug_log(f"尝试解析的内容: {cleaned_result[:200]}", "ERROR")
+            
+            # 常见的不规范写法：单引号、多余的逗号，修正后再按 JSON 解析
+            fixed = _RE_TRAILING_COMMA.sub(r'\1', cleaned_result.replace("'", '"'))
+            try:
+                title_data = json_loads(fixed)
+                self.debug_log("修正格式后解析标题JSON", "WARNING")
+                return title_data
+            except json.JSONDecodeError:
+                pass
+            
+            # 仍然失败时按 Python 字面量解析（只解析字面量，不执行代码）
+            try:
+                title_data = ast.literal_eval(cleaned_result)
+                self.debug_log("使用literal_eval解析标题数据", "WARNING")
+                return title_data
+            except (ValueError, SyntaxError) as eval_e:
+                self.debug_log(f"literal_eval解析也失败: {eval_e}", "ERROR")
+                return None
+
     def process_single_topic(self, topic: str) -> Dict:
         """处理单个话题"""
-        result = {
+        result = self._new_result(topic)
+        self._logger.debug("开始处理话题: %s", topic)
+        
+        # 生成Thread
+        thread = self.generate_thread(topic)
+        if not self._accept_thread(result, thread):
+            return result
+        
+        # 提取标题并生成图像提示词
+        self._accept_title(result, self.extract_title_from_thread(thread))
+        return result
+
+    async def aprocess_single_topic(self, topic: str) -> Dict:
+        """处理单个话题（异步版本），参数和返回值同 process_single_topic"""
+        result = self._new_result(topic)
+        self._logger.debug("开始处理话题: %s", topic)
+        
+        # 生成Thread
+        thread = await self.agenerate_thread(topic)
+        if not self._accept_thread(result, thread):
+            return result
+        
+        # 提取标题并生成图像提示词
+        self._accept_title(result, await self.aextract_title_from_thread(thread))
+        return result
+
+    def _new_result(self, topic: str) -> Dict:
+        """单个话题的初始处理结果"""
+        return {
             "topic": topic,
             "thread": None,
             "title_data": None,
             "image_prompt": None,
             "success": False
         }
-        
-        self.debug_log(f"开始处理话题: {topic}")
-        
-        # 生成Thread
-        thread = self.generate_thread(topic)
+
+    def _accept_thread(self, result: Dict, thread: Optional[str]) -> bool:
+        """清理并记录生成的Thread，生成失败时返回 False"""
+        topic = result["topic"]
         if not thread:
             self.debug_log(f"话题「{topic}」Thread生成失败", "ERROR")
-            return result
+            return False
             
         # 清理Thread回复格式
         cleaned_thread = self.clean_json_response(thread)
@@ -208,70 +341,106 @@ Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable fo
         
         # 验证Thread格式
         try:
-            thread_json = json.loads(cleaned_thread)
-            self.debug_log(f"Thread JSON解析成功，包含 {len(thread_json)} 条推文")
+            thread_json = json_loads(cleaned_thread)
+            self._logger.debug("Thread JSON解析成功，包含 %s 条推文", len(thread_json))
         except json.JSONDecodeError:
             self.debug_log(f"Thread JSON格式有误，但继续处理", "WARNING")
-        
-        # 提取标题
-        title_data = self.extract_title_from_thread(thread)
+        return True
+
+    def _accept_title(self, result: Dict, title_data: Optional[Dict[str, str]]):
+        """记录提取的标题并生成图像提示词"""
+        topic = result["topic"]
         if not title_data:
             self.debug_log(f"话题「{topic}」标题提取失败", "ERROR")
-            return result
+            return
             
         result["title_data"] = title_data
         
         # 生成图像提示词
-        if "主标题" in title_data and "副标题" in title_data:
+        if isinstance(title_data, dict) and _TITLE_KEYS <= title_data.keys():
             image_prompt = self.build_image_prompt(
                 title_data["主标题"], 
                 title_data["副标题"]
             )
             result["image_prompt"] = image_prompt
             result["success"] = True
-            self.debug_log(f"话题「{topic}」处理完成")
+            self._logger.debug("话题「%s」处理完成", topic)
         else:
             self.debug_log(f"话题「{topic}」标题数据格式错误: {title_data}", "ERROR")
+
+    def process_all_topics(self, topics_file: str = "input/topics.txt",
+                           max_workers: int = MAX_CONCURRENT_TOPICS) -> List[Dict]:
+        """
+        处理所有话题（同步接口，内部运行 process_all_topics_async）
+        
+        注意：不能在已运行的事件循环中调用，异步代码请直接 await process_all_topics_async()
+        
+        Args:
+            topics_file: 话题文件路径
+            max_workers: 同时处理的话题数上限
             
-        return result
+        Returns:
+            所有话题的处理结果，顺序与话题文件一致
+        """
+        return asyncio.run(self.process_all_topics_async(topics_file, max_workers))
 
-    def process_all_topics(self, topics_file: str = "input/topics.txt") -> List[Dict]:
-        """处理所有话题"""
+    async def process_all_topics_async(self, topics_file: str = "input/topics.txt",
+                                       max_concurrency: int = MAX_CONCURRENT_TOPICS) -> List[Dict]:
+        """
+        并发处理所有话题
+        
+        每个话题的两次 GPT 请求仍然先后进行，不同话题之间在同一个事件循环里并发等待，
+        总耗时接近最慢的话题而不是所有话题之和
+        
+        Args:
+            topics_file: 话题文件路径
+            max_concurrency: 同时处理的话题数上限
+            
+        Returns:
+            所有话题的处理结果，顺序与话题文件一致
+        """
         topics = self.read_topics(topics_file)
         if not topics:
             self.debug_log("没有话题需要处理", "ERROR")
             return []
             
-        self.debug_log(f"准备处理 {len(topics)} 个话题")
-        results = []
+        self._logger.debug("准备并发处理 %s 个话题（并发上限 %s）", len(topics), max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
         
-        for i, topic in enumerate(topics, 1):
-            self.debug_log(f"📝 处理第 {i}/{len(topics)} 个选题")
-            print(f"🔄 正在生成 Thread: \"{topic}\"")
-            
-            result = self.process_single_topic(topic)
-            results.append(result)
-            
-            if result["success"]:
-                print(f"✅ 处理成功: \"{topic}\"")
-            else:
-                print(f"❌ 处理失败: \"{topic}\"")
-            
-        # 统计结果
-        success_count = sum(1 for r in results if r["success"])
-        self.debug_log(f"处理完成: {success_count}/{len(results)} 个话题成功")
-        self.debug_log(f"总计API调用: {self.request_count} 次")
+        async def handle(i: int, topic: str) -> Dict:
+            async with semaphore:
+                self._logger.debug("📝 处理第 %s/%s 个选题", i, len(topics))
+                print(f"🔄 正在生成 Thread: \"{topic}\"")
+                result = await self.aprocess_single_topic(topic)
+                self._print_topic_outcome(result)
+                return result
+        
+        results = await asyncio.gather(*(handle(i, topic) for i, topic in enumerate(topics, 1)))
         
-        return results
+        self._log_summary(results)
+        return list(results)
+
+    def _print_topic_outcome(self, result: Dict):
+        """打印单个话题的处理结果"""
+        if result["success"]:
+            print(f"✅ 处理成功: \"{result['topic']}\"")
+        else:
+            print(f"❌ 处理失败: \"{result['topic']}\"")
+
+    def _log_summary(self, results: List[Dict]):
+        """统计处理结果"""
+        success_count = sum(1 for r in results if r["success"])
+        self._logger.debug("处理完成: %s/%s 个话题成功", success_count, len(results))
+        self._logger.debug("总计API调用: %s 次", self.request_count)
 
     def save_results(self, results: List[Dict], output_file: str = "output/thread_results.json"):
         """保存结果到文件"""
-        self.debug_log(f"开始保存结果到: {output_file}")
+        self._logger.debug("开始保存结果到: %s", output_file)
         try:
             os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
-            self.debug_log(f"结果已保存到: {output_file}")
+            # 整个结果一次序列化为字节串（优先使用 orjson），一次写入
+            dump_file(results, output_file)
+            self._logger.debug("结果已保存到: %s", output_file)
             print(f"💾 结果已保存到: {output_file}")
         except Exception as e:
             self.debug_log(f"保存结果失败: {e}", "ERROR")
@@ -286,8 +455,8 @@ def main():
         print("🚀 Twitter Thread 生成器启动")
         generator = ThreadGenerator()
         
-        # 处理所有话题
-        results = generator.process_all_topics()
+        # 并发处理所有话题
+        results = asyncio.run(generator.process_all_topics_async())
         
         # 保存结果
         generator.save_results(results)
@@ -301,7 +470,7 @@ def main():
             
             # 尝试解析并美化显示Thread
             try:
-                thread_data = json.loads(result['thread'])
+                thread_data = json_loads(result['thread'])
                 print(f"\n🧵 Thread ({len(thread_data)} 条):")
                 for i, tweet in enumerate(thread_data, 1):
                     print(f"  {i}. {tweet.get('tweet', '')}")
@@ -7,12 +7,21 @@
 
 import os
 import sys
+import time
 from typing import List, Dict, Optional
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from core.config.config import config
+from core.utils.json_io import dump_file
+
+try:
+    # 草稿序列化为 msgpack：编码更快，文件更小
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
 
 
 class Publisher:
@@ -24,19 +33,21 @@ class Publisher:
         
         self.config = config
         self.enabled = config.enable_publishing
-        
-        if not self.enabled:
-            print("📝 发布功能已禁用（默认状态）")
-            print("💡 如需启用发布功能，请在 .env 文件中设置 ENABLE_PUBLISHING=true")
-            return
-        
-        print("🚀 发布功能已启用")
+        # 状态提示推迟到第一次检查可用性时输出（只创建实例不会打印）
+        self._banner_printed = False
         
         # 这里可以添加其他发布平台的客户端初始化
         # 例如: Twitter API, 微博 API 等
 
     def is_available(self) -> bool:
         """检查发布功能是否可用"""
+        if not self._banner_printed:
+            self._banner_printed = True
+            if self.enabled:
+                print("🚀 发布功能已启用")
+            else:
+                print("📝 发布功能已禁用（默认状态）")
+                print("💡 如需启用发布功能，请在 .env 文件中设置 ENABLE_PUBLISHING=true")
         return self.enabled
 
     def publish_thread(self, thread: List[Dict], topic: str = "", images: List[str] = None) -> bool:
@@ -81,11 +92,10 @@ class Publisher:
             是否保存成功
         """
         try:
-            from datetime import datetime
-            import json
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"draft_{timestamp}_{topic[:20].replace('/', '_')}.json"
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            use_msgpack = MSGPACK_AVAILABLE and self.config.draft_format == 'msgpack'
+            extension = "msgpack" if use_msgpack else "json"
+            filename = f"draft_{timestamp}_{topic[:20].replace('/', '_')}.{extension}"
             filepath = os.path.join(self.config.output_dir, filename)
             
             draft_data = {
@@ -97,8 +107,13 @@ class Publisher:
                 "platform": "local"
             }
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(draft_data, f, ensure_ascii=False, indent=2)
+            if use_msgpack:
+                # 查看内容: python tools/read_draft.py <文件>
+                with open(filepath, 'wb') as f:
+                    f.write(msgpack.packb(draft_data, use_bin_type=True))
+            else:
+                # 优先使用 orjson 直接序列化为 UTF-8 字节，一次写入
+                dump_file(draft_data, filepath)
             
             print(f"✅ 草稿已保存: {filename}")
             return True
@@ -115,16 +130,18 @@ class Publisher:
             thread: Thread 内容
             topic: 选题标题
         """
-        print(f"\n📋 Thread 预览: {topic}")
-        print("=" * 60)
+        # 整个预览拼成一个字符串，一次写入 stdout
+        separator = "-" * 40 + "\n"
+        buf = [f"\n📋 Thread 预览: {topic}\n", "=" * 60, "\n"]
         
         for i, tweet in enumerate(thread, 1):
             content = tweet.get("tweet", "")
-            print(f"{i:2d}. {content}")
-            print("-" * 40)
+            buf.append(f"{i:2d}. {content}\n")
+            buf.append(separator)
         
-        print(f"总计: {len(thread)} 条推文")
-        print("=" * 60)
+        buf.append(f"总计: {len(thread)} 条推文\n")
+        buf.append("=" * 60 + "\n")
+        sys.stdout.write(''.join(buf))
 
     def enable_publishing(self) -> None:
         """临时启用发布功能（当前会话有效）"""
@@ -138,9 +155,16 @@ class Publisher:
         print("❌ 发布功能已禁用")
 
 
-# 创建全局发布器实例
-try:
-    publisher = Publisher()
-except Exception as e:
-    print(f"❌ 发布器初始化失败: {e}")
-    publisher = None
\ No newline at end of file
+# 全局发布器实例（延迟初始化，导入模块时不创建）
+publisher = None
+
+def get_publisher() -> Optional[Publisher]:
+    """获取发布器实例（延迟初始化）"""
+    global publisher
+    if publisher is None:
+        try:
+            publisher = Publisher()
+        except Exception as e:
+            print(f"❌ 发布器初始化失败: {e}")
+            publisher = None
+    return publisher
\ No newline at end of file
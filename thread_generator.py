@@ -9,20 +9,128 @@ import os
 import sys
 import re
 import time
-import inspect
+import asyncio
+import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(__file__))
 
 from core.gpt.gpt_client import gpt_client
-from core.utils.logger import setup_logging, cleanup_logging
+from core.utils.logger import setup_logging, cleanup_logging, get_console_logger
+from core.utils.topics_file import read_topic_lines
+from core.prompts import build_image_prompt
+from core.utils.json_io import loads as json_loads
+from core.utils.llm_cache import LLMCache
+
+try:
+    # 异步写文件，并发处理话题时保存结果不阻塞事件循环
+    import aiofiles
+    AIOFILES_AVAILABLE = True
+except ImportError:
+    AIOFILES_AVAILABLE = False
+
+# 选题转文件名：去掉问号，空格换成下划线（一次 translate 完成）
+_FILENAME_TRANS = str.maketrans({'？': None, '?': None, ' ': '_'})
 
 # 输出目录
 OUTPUT_DIR = Path('./output')
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# 并发处理话题时，同时进行的话题数上限
+MAX_CONCURRENT_TOPICS = 8
+
+THREAD_SYSTEM_PROMPT = "你是一个擅长写爆款 thread 的中文内容创作者，风格克制、实用、带讽刺感。"
+TITLE_SYSTEM_PROMPT = "你是内容包装专家，负责生成社交媒体图像用标题。"
+
+# 标题数据必须包含的字段
+_TITLE_KEYS = frozenset(("主标题", "副标题"))
+
+# Thread 和标题提示词的固定部分在模块加载时拆成前后两段，每次调用只拼接变量部分
+_THREAD_PROMPT_PREFIX = """
+请以「"""
+_THREAD_PROMPT_BODY = """」为主题，写一条7条结构的中文X（Twitter）thread。
+
+结构要求：
+1. 每条编号用 1/, 2/, 3/ 表示；
+2. 每条内容采用"短句 + 空行"排版，分段表达，增加节奏感；
+3. 内容格式整体贴近如下风格：
+
+1/
+搞副业做不起来？
+可能你从一开始就理解错了"副业"这两个字。
+
+副业不是副本任务，不是闲时填空，
+它是一场结构试验、一场变现演练。
+
+...
+
+风格要求：
+- 不喊口号，不灌鸡汤
+- 用冷静现实的口吻，带轻度讽刺
+- 每条不超过220字
+"""
+# Thread 提示词的最后一条输出要求；合并生成时换成 COMBINED_OUTPUT_INSTRUCTION
+_THREAD_OUTPUT_RULE = "- 最后输出为完整 thread 文本，一整段文本，直接用于 X 平台发帖\n"
+
+_TITLE_PROMPT_PREFIX = """
+请你根据下列 thread 内容，提炼一组图像封面用标题：
+
+内容如下：
+"""
+_TITLE_PROMPT_SUFFIX = """
+
+返回格式：
+{
+  "主标题": "不超过12字，来自核心观点",
+  "副标题": "不超过18字，补充说明主标题，形成张力"
+}
+"""
+
+# 合并生成时替换 Thread 提示词的输出要求：同一次请求里同时返回封面标题，省去第二次请求和重新发送 Thread 全文
+COMBINED_OUTPUT_INSTRUCTION = """- 写好后根据 thread 内容，同时提炼一组图像封面用标题
+
+最后只返回如下 JSON，不要输出其他文本（thread 中的换行用 \\n 表示）：
+{
+  "thread": "完整 thread 文本",
+  "主标题": "不超过12字，来自核心观点",
+  "副标题": "不超过18字，补充说明主标题，形成张力"
+}
+"""
+
+# 调试日志格式：[级别] 文件名:行号 - 消息
+DEBUG_LOG_FORMAT = '[%(levelname)s] %(filename)s:%(lineno)d - %(message)s'
+
+# debug_log 的级别名称到 logging 级别的映射
+LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+# markdown 代码块标记：开始标记 ```json（连同后面的空白）和单独一行的结束标记 ```，一次替换全部去掉
+_RE_JSON_FENCE = re.compile(r'^```(?:json\s*|\s*$)', re.MULTILINE)
+
+
+def _complete_json(text: str) -> Optional[str]:
+    """
+    检查流式接收到的文本中 JSON 对象是否已经完整
+
+    Returns:
+        截止到 JSON 对象结束位置的文本，尚不完整时返回 None
+    """
+    start = text.find('{')
+    end = text.rfind('}')
+    if start < 0 or end < start:
+        return None
+    try:
+        json_loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return text[:end + 1]
+
 
 class ThreadGenerator:
     """Twitter Thread 生成器"""
@@ -33,27 +141,37 @@ class ThreadGenerator:
         self.gpt = gpt_client
         self.total_tokens = 0
         self.request_count = 0
+        # 相同提示词的请求直接读取本地缓存（重复选题、失败后重跑）
+        self.cache = LLMCache(str(OUTPUT_DIR / '.llm_cache.sqlite'))
+        # 调试输出的级别可以通过 LOG_LEVEL 环境变量调高（如 INFO），低于该级别的日志不会格式化参数
+        log_level = LOG_LEVELS.get(os.getenv('LOG_LEVEL', 'DEBUG').upper(), logging.DEBUG)
+        self._logger = get_console_logger(__name__, DEBUG_LOG_FORMAT, log_level)
         
     def debug_log(self, message: str, level: str = "DEBUG"):
-        """调试日志，包含文件位置信息"""
-        frame = inspect.currentframe().f_back
-        filename = os.path.basename(frame.f_filename)
-        line_number = frame.f_lineno
-        print(f"[{level}] {filename}:{line_number} - {message}")
+        """
+        调试日志，包含文件位置信息（由 logging 记录调用者的位置，stacklevel=2 指向 debug_log 的调用方）
+        
+        DEBUG 级别的日志直接调用 self._logger.debug 并用 %s 传参，级别未开启时不会拼接字符串
+        """
+        self._logger.log(LOG_LEVELS.get(level, logging.DEBUG), message, stacklevel=2)
         
     def log_token_usage(self, usage_info: str):
-        """记录token使用情况"""
+        """
+        记录token使用情况
+        
+        这里只有计数和字符串拼接，JIT（如 numba）对字符串处理没有帮助；
+        以后加入按时间窗口统计耗时、token 速率等数值计算时，再把数值部分写成 numba.njit 函数
+        """
         self.request_count += 1
-        self.debug_log(f"请求#{self.request_count} - {usage_info}")
-        self.debug_log(f"总请求数: {self.request_count}, 累计tokens: {self.total_tokens}")
+        self._logger.debug("请求#%s - %s", self.request_count, usage_info)
+        self._logger.debug("总请求数: %s, 累计tokens: %s", self.request_count, self.total_tokens)
 
     def read_topics(self, file_path: str = "input/topics.txt") -> List[str]:
         """读取话题列表"""
-        self.debug_log(f"开始读取话题文件: {file_path}")
+        self._logger.debug("开始读取话题文件: %s", file_path)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                topics = [line.strip() for line in f if line.strip()]
-            self.debug_log(f"成功读取 {len(topics)} 个话题")
+            topics = read_topic_lines(file_path)
+            self._logger.debug("成功读取 %s 个话题", len(topics))
             return topics
         except FileNotFoundError:
             self.debug_log(f"话题文件 {file_path} 不存在", "ERROR")
@@ -64,148 +182,318 @@ class ThreadGenerator:
 
     def build_thread_prompt(self, topic: str) -> str:
         """构建Thread生成提示词 - 严格按照demo"""
-        return f"""
-请以「{topic}」为主题，写一条7条结构的中文X（Twitter）thread。
-
-结构要求：
-1. 每条编号用 1/, 2/, 3/ 表示；
-2. 每条内容采用"短句 + 空行"排版，分段表达，增加节奏感；
-3. 内容格式整体贴近如下风格：
-
-1/
-搞副业做不起来？
-可能你从一开始就理解错了"副业"这两个字。
-
-副业不是副本任务，不是闲时填空，
-它是一场结构试验、一场变现演练。
-
-...
-
-风格要求：
-- 不喊口号，不灌鸡汤
-- 用冷静现实的口吻，带轻度讽刺
-- 每条不超过220字
-- 最后输出为完整 thread 文本，一整段文本，直接用于 X 平台发帖
-"""
+        return _THREAD_PROMPT_PREFIX + topic + _THREAD_PROMPT_BODY + _THREAD_OUTPUT_RULE
 
     def build_title_prompt(self, thread_text: str) -> str:
         """构建标题提取提示词 - 严格按照demo"""
-        return f"""
-请你根据下列 thread 内容，提炼一组图像封面用标题：
-
-内容如下：
-{thread_text}
+        return _TITLE_PROMPT_PREFIX + thread_text + _TITLE_PROMPT_SUFFIX
 
-返回格式：
-{{
-  "主标题": "不超过12字，来自核心观点",
-  "副标题": "不超过18字，补充说明主标题，形成张力"
-}}
-"""
+    def build_combined_prompt(self, topic: str) -> str:
+        """构建Thread和封面标题一次生成的提示词"""
+        return _THREAD_PROMPT_PREFIX + topic + _THREAD_PROMPT_BODY + COMBINED_OUTPUT_INSTRUCTION
 
     def build_image_prompt(self, title: str, subtitle: str) -> str:
         """构建图像生成提示词 - 严格按照demo"""
-        return f"""Black background, large bold yellow Chinese text: '{title}'.
-Below that in smaller white font: '{subtitle}'.
-Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable for attention-grabbing social media thumbnail."""
+        return build_image_prompt(title, subtitle)
 
     def clean_json_response(self, response: str) -> str:
         """清理GPT回复中的markdown格式，提取纯JSON"""
-        self.debug_log(f"开始清理JSON回复，原始长度: {len(response)}")
+        self._logger.debug("开始清理JSON回复，原始长度: %s", len(response))
         
-        # 移除markdown代码块标记
-        response = re.sub(r'^```json\s*', '', response, flags=re.MULTILINE)
-        response = re.sub(r'^```\s*$', '', response, flags=re.MULTILINE)
+        # 移除markdown代码块标记（没有代码块时跳过正则替换）
+        if '```' in response:
+            response = _RE_JSON_FENCE.sub('', response)
         response = response.strip()
         
-        self.debug_log(f"清理后长度: {len(response)}")
-        self.debug_log(f"清理后前100字符: {response[:100]}")
+        self._logger.debug("清理后长度: %s", len(response))
+        self._logger.debug("清理后前100字符: %.100s", response)
         
         return response
 
+    def _thread_messages(self, topic: str) -> List[Dict[str, str]]:
+        """Thread生成请求的消息列表"""
+        return [
+            {"role": "system", "content": THREAD_SYSTEM_PROMPT},
+            {"role": "user", "content": self.build_thread_prompt(topic)}
+        ]
+
+    def _title_messages(self, thread_text: str) -> List[Dict[str, str]]:
+        """标题提取请求的消息列表"""
+        return [
+            {"role": "system", "content": TITLE_SYSTEM_PROMPT},
+            {"role": "user", "content": self.build_title_prompt(thread_text)}
+        ]
+
+    def _combined_messages(self, topic: str) -> List[Dict[str, str]]:
+        """Thread和标题一次生成请求的消息列表"""
+        return [
+            {"role": "system", "content": THREAD_SYSTEM_PROMPT},
+            {"role": "user", "content": self.build_combined_prompt(topic)}
+        ]
+
+    def _cache_key(self, messages: List[Dict[str, str]], temperature: float) -> str:
+        """请求的缓存键：模型 + 消息 + 温度"""
+        return LLMCache.make_key(self.gpt.model, messages, temperature)
+
+    def _chat(self, messages: List[Dict[str, str]], temperature: float) -> Optional[str]:
+        """调用 GPT，命中缓存时不发送请求"""
+        key = self._cache_key(messages, temperature)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._logger.debug("命中缓存，跳过API调用")
+            return cached
+        result = self.gpt.chat_completion(messages, temperature=temperature)
+        if result:
+            self.cache.set(key, result)
+        return result
+
+    async def _achat(self, messages: List[Dict[str, str]], temperature: float) -> Optional[str]:
+        """调用 GPT（异步版本），命中缓存时不发送请求"""
+        key = self._cache_key(messages, temperature)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._logger.debug("命中缓存，跳过API调用")
+            return cached
+        result = await self.gpt.achat_completion(messages, temperature=temperature)
+        if result:
+            self.cache.set(key, result)
+        return result
+
+    def _chat_json(self, messages: List[Dict[str, str]], temperature: float) -> Optional[str]:
+        """
+        流式调用 GPT，回复中的 JSON 对象完整后立即停止接收（不再等待结尾的说明文字）
+
+        只有 JSON 完整的回复写入缓存；命中缓存时不发送请求
+        """
+        key = self._cache_key(messages, temperature)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._logger.debug("命中缓存，跳过API调用")
+            return cached
+        
+        parts = []
+        result = None
+        stream = self.gpt.stream_chat_completion(messages, temperature=temperature)
+        try:
+            for delta in stream:
+                parts.append(delta)
+                if '}' in delta:
+                    result = _complete_json(''.join(parts))
+                    if result:
+                        break
+        finally:
+            stream.close()
+        
+        if result:
+            self.cache.set(key, result)
+            return result
+        return ''.join(parts) or None
+
+    async def _achat_json(self, messages: List[Dict[str, str]], temperature: float) -> Optional[str]:
+        """流式调用 GPT（异步版本），JSON 对象完整后立即停止接收"""
+        key = self._cache_key(messages, temperature)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._logger.debug("命中缓存，跳过API调用")
+            return cached
+        
+        parts = []
+        result = None
+        stream = self.gpt.astream_chat_completion(messages, temperature=temperature)
+        try:
+            async for delta in stream:
+                parts.append(delta)
+                if '}' in delta:
+                    result = _complete_json(''.join(parts))
+                    if result:
+                        break
+        finally:
+            await stream.aclose()
+        
+        if result:
+            self.cache.set(key, result)
+            return result
+        return ''.join(parts) or None
+
     def generate_thread(self, topic: str) -> Optional[str]:
         """生成Thread内容"""
-        self.debug_log(f"开始生成Thread，话题: {topic}")
+        self._logger.debug("开始生成Thread，话题: %s", topic)
         try:
-            system_prompt = "你是一个擅长写爆款 thread 的中文内容创作者，风格克制、实用、带讽刺感。"
-            user_prompt = self.build_thread_prompt(topic)
-            
             start_time = time.time()
-            result = self.gpt.chat_completion([
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ], temperature=0.85)
-            end_time = time.time()
-            
-            self.log_token_usage(f"Thread生成 - 耗时: {end_time-start_time:.2f}s")
+            result = self._chat(self._thread_messages(topic), 0.85)
+            return self._check_thread(topic, result, time.time() - start_time)
             
-            if result:
-                result = result.strip()
-                self.debug_log(f"成功生成话题「{topic}」的Thread，长度: {len(result)}字符")
-                self.debug_log(f"Thread前200字符: {result[:200]}...")
-            else:
-                self.debug_log(f"生成话题「{topic}」的Thread失败", "ERROR")
-                
-            return result
+        except Exception as e:
+            self.debug_log(f"生成Thread时出错: {e}", "ERROR")
+            return None
+
+    async def agenerate_thread(self, topic: str) -> Optional[str]:
+        """生成Thread内容（异步版本）"""
+        self._logger.debug("开始生成Thread，话题: %s", topic)
+        try:
+            start_time = time.time()
+            result = await self._achat(self._thread_messages(topic), 0.85)
+            return self._check_thread(topic, result, time.time() - start_time)
             
         except Exception as e:
             self.debug_log(f"生成Thread时出错: {e}", "ERROR")
             return None
 
+    def _check_thread(self, topic: str, result: Optional[str], elapsed: float) -> Optional[str]:
+        """记录Thread生成的耗时和结果"""
+        self.log_token_usage(f"Thread生成 - 耗时: {elapsed:.2f}s")
+        
+        if result:
+            result = result.strip()
+            self._logger.debug("成功生成话题「%s」的Thread，长度: %s字符", topic, len(result))
+            self._logger.debug("Thread前200字符: %.200s...", result)
+        else:
+            self.debug_log(f"生成话题「{topic}」的Thread失败", "ERROR")
+            
+        return result
+
     def extract_title_from_thread(self, thread_text: str) -> Optional[Dict[str, str]]:
         """从Thread中提取标题"""
-        self.debug_log("开始提取标题")
+        self._logger.debug("开始提取标题")
         try:
-            system_prompt = "你是内容包装专家，负责生成社交媒体图像用标题。"
-            user_prompt = self.build_title_prompt(thread_text)
-            
             start_time = time.time()
-            result = self.gpt.chat_completion([
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ], temperature=0.7)
-            end_time = time.time()
-            
-            self.log_token_usage(f"标题提取 - 耗时: {end_time-start_time:.2f}s")
-            
-            if result:
-                self.debug_log(f"获得标题回复，长度: {len(result)}字符")
+            result = self._chat_json(self._title_messages(thread_text), 0.7)
+            return self._parse_title_result(result, time.time() - start_time)
                 
-                # 清理回复格式
-                cleaned_result = self.clean_json_response(result)
-                
-                # 安全解析JSON
-                try:
-                    title_data = json.loads(cleaned_result)
-                    self.debug_log("成功解析标题JSON")
-                    return title_data
-                except json.JSONDecodeError as e:
-                    self.debug_log(f"JSON解析失败: {e}", "ERROR")
-                    self.debug_log(f"尝试解析的内容: {cleaned_result[:200]}", "ERROR")
-                    return None
-            else:
-                self.debug_log("标题提取失败", "ERROR")
-                return None
+        except Exception as e:
+            self.debug_log(f"提取标题时出错: {e}", "ERROR")
+            return None
+
+    async def aextract_title_from_thread(self, thread_text: str) -> Optional[Dict[str, str]]:
+        """从Thread中提取标题（异步版本）"""
+        self._logger.debug("开始提取标题")
+        try:
+            start_time = time.time()
+            result = await self._achat_json(self._title_messages(thread_text), 0.7)
+            return self._parse_title_result(result, time.time() - start_time)
                 
         except Exception as e:
             self.debug_log(f"提取标题时出错: {e}", "ERROR")
             return None
 
+    def _parse_title_result(self, result: Optional[str], elapsed: float) -> Optional[Dict[str, str]]:
+        """记录标题提取的耗时，并解析标题回复"""
+        self.log_token_usage(f"标题提取 - 耗时: {elapsed:.2f}s")
+        
+        if not result:
+            self.debug_log("标题提取失败", "ERROR")
+            return None
+        
+        self._logger.debug("获得标题回复，长度: %s字符", len(result))
+        
+        # 清理回复格式
+        cleaned_result = self.clean_json_response(result)
+        
+        # 安全解析JSON
+        try:
+            title_data = json_loads(cleaned_result)
+            self._logger.debug("成功解析标题JSON")
+            return title_data
+        except json.JSONDecodeError as e:
+            self.debug_log(f"JSON解析失败: {e}", "ERROR")
+            self.debug_log(f"尝试解析的内容: {cleaned_result[:200]}", "ERROR")
+            return None
+
+    def generate_thread_and_title(self, topic: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """
+        一次请求同时生成Thread和封面标题
+        
+        Returns:
+            (Thread文本, 标题数据)，生成或解析失败时返回 None
+        """
+        self._logger.debug("开始生成Thread和标题，话题: %s", topic)
+        try:
+            start_time = time.time()
+            result = self._chat_json(self._combined_messages(topic), 0.85)
+            return self._parse_combined_result(topic, result, time.time() - start_time)
+            
+        except Exception as e:
+            self.debug_log(f"生成Thread和标题时出错: {e}", "ERROR")
+            return None
+
+    async def agenerate_thread_and_title(self, topic: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """一次请求同时生成Thread和封面标题（异步版本）"""
+        self._logger.debug("开始生成Thread和标题，话题: %s", topic)
+        try:
+            start_time = time.time()
+            result = await self._achat_json(self._combined_messages(topic), 0.85)
+            return self._parse_combined_result(topic, result, time.time() - start_time)
+            
+        except Exception as e:
+            self.debug_log(f"生成Thread和标题时出错: {e}", "ERROR")
+            return None
+
+    def _parse_combined_result(self, topic: str, result: Optional[str],
+                               elapsed: float) -> Optional[Tuple[str, Dict[str, str]]]:
+        """记录耗时，并从合并回复中拆出Thread文本和标题数据"""
+        self.log_token_usage(f"Thread和标题生成 - 耗时: {elapsed:.2f}s")
+        
+        if not result:
+            self.debug_log(f"生成话题「{topic}」的Thread和标题失败", "ERROR")
+            return None
+        
+        cleaned_result = self.clean_json_response(result)
+        try:
+            data = json_loads(cleaned_result)
+        except json.JSONDecodeError as e:
+            self.debug_log(f"合并回复JSON解析失败: {e}", "WARNING")
+            return None
+        
+        thread_text = data.get("thread") if isinstance(data, dict) else None
+        if not isinstance(thread_text, str) or not thread_text.strip():
+            self.debug_log("合并回复缺少thread字段", "WARNING")
+            return None
+        
+        title_data = {key: data[key] for key in _TITLE_KEYS if key in data}
+        self._logger.debug("成功生成话题「%s」的Thread和标题，Thread长度: %s字符", topic, len(thread_text))
+        return thread_text.strip(), title_data
+
+    def _thread_file(self, topic: str, thread_text: str, title_data: Dict[str, str],
+                     image_prompt: str) -> Tuple[Path, str]:
+        """Thread文件的路径和内容 - 严格按照demo格式"""
+        safe_filename = topic[:30].translate(_FILENAME_TRANS)
+        file_path = OUTPUT_DIR / f"{safe_filename}.txt"
+        
+        # 各部分拼接成一个字符串，一次写入
+        parts = [
+            "🎯 选题：", topic,
+            "\n\n🧵 Thread：\n", thread_text,
+            "\n\n📌 主标题：", title_data['主标题'],
+            "\n📌 副标题：", title_data['副标题'],
+            "\n\n🎨 图像Prompt：\n", image_prompt, "\n"
+        ]
+        return file_path, ''.join(parts)
+
     def save_thread(self, topic: str, thread_text: str, title_data: Dict[str, str], image_prompt: str):
         """保存Thread到文件 - 严格按照demo格式"""
-        self.debug_log(f"开始保存Thread: {topic}")
+        self._logger.debug("开始保存Thread: %s", topic)
         try:
-            safe_filename = topic[:30].replace('？', '').replace('?', '').replace(' ', '_')
-            file_path = OUTPUT_DIR / f"{safe_filename}.txt"
+            file_path, content = self._thread_file(topic, thread_text, title_data, image_prompt)
+            file_path.write_text(content, encoding='utf-8')
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(f"🎯 选题：{topic}\n\n")
-                f.write(f"🧵 Thread：\n{thread_text}\n\n")
-                f.write(f"📌 主标题：{title_data['主标题']}\n")
-                f.write(f"📌 副标题：{title_data['副标题']}\n\n")
-                f.write(f"🎨 图像Prompt：\n{image_prompt}\n")
+            self._logger.debug("Thread已保存至: %s", file_path)
+            print(f"✅ 已保存至：{file_path}")
             
-            self.debug_log(f"Thread已保存至: {file_path}")
+        except Exception as e:
+            self.debug_log(f"保存Thread失败: {e}", "ERROR")
+
+    async def asave_thread(self, topic: str, thread_text: str, title_data: Dict[str, str], image_prompt: str):
+        """保存Thread到文件（异步版本），优先使用 aiofiles，未安装时放到线程中写入"""
+        self._logger.debug("开始保存Thread: %s", topic)
+        try:
+            file_path, content = self._thread_file(topic, thread_text, title_data, image_prompt)
+            if AIOFILES_AVAILABLE:
+                async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+                    await f.write(content)
+            else:
+                await asyncio.to_thread(file_path.write_text, content, encoding='utf-8')
+            
+            self._logger.debug("Thread已保存至: %s", file_path)
             print(f"✅ 已保存至：{file_path}")
             
         except Exception as e:
@@ -213,50 +501,114 @@ Center-aligned, minimalist layout, high contrast, 16:9 aspect ratio, suitable fo
 
     def process_topic(self, topic: str) -> bool:
         """处理单个话题"""
-        self.debug_log(f"开始处理话题: {topic}")
+        self._logger.debug("开始处理话题: %s", topic)
         print(f"\n=== 🎯 正在处理选题：{topic} ===")
         
-        # 生成Thread
-        thread_text = self.generate_thread(topic)
-        if not thread_text:
-            self.debug_log(f"话题「{topic}」Thread生成失败", "ERROR")
+        # Thread和标题一次生成；合并回复无法解析时回退到分两次请求
+        combined = self.generate_thread_and_title(topic)
+        if combined:
+            thread_text, title_data = combined
+            self._accept_thread(topic, thread_text)
+            if not _TITLE_KEYS <= title_data.keys():
+                # Thread 已生成，只是标题字段不全：单独提取标题，不丢弃这条 Thread
+                title_data = self.extract_title_from_thread(thread_text)
+        else:
+            thread_text = self.generate_thread(topic)
+            if not self._accept_thread(topic, thread_text):
+                return False
+            title_data = self.extract_title_from_thread(thread_text)
+        
+        image_prompt = self._accept_title(topic, title_data)
+        if not image_prompt:
             return False
         
-        print("\n🧵 Thread 内容：\n", thread_text)
+        # 保存结果
+        self.save_thread(topic, thread_text, title_data, image_prompt)
+        
+        self._logger.debug("话题「%s」处理完成", topic)
+        return True
+
+    async def aprocess_topic(self, topic: str) -> bool:
+        """处理单个话题（异步版本），参数和返回值同 process_topic"""
+        self._logger.debug("开始处理话题: %s", topic)
+        print(f"\n=== 🎯 正在处理选题：{topic} ===")
         
-        # 提取标题
-        title_data = self.extract_title_from_thread(thread_text)
-        if not title_data or "主标题" not in title_data or "副标题" not in title_data:
-            self.debug_log(f"话题「{topic}」标题提取失败", "ERROR")
+        # Thread和标题一次生成；合并回复无法解析时回退到分两次请求
+        combined = await self.agenerate_thread_and_title(topic)
+        if combined:
+            thread_text, title_data = combined
+            self._accept_thread(topic, thread_text)
+            if not _TITLE_KEYS <= title_data.keys():
+                # Thread 已生成，只是标题字段不全：单独提取标题，不丢弃这条 Thread
+                title_data = await self.aextract_title_from_thread(thread_text)
+        else:
+            thread_text = await self.agenerate_thread(topic)
+            if not self._accept_thread(topic, thread_text):
+                return False
+            title_data = await self.aextract_title_from_thread(thread_text)
+        
+        image_prompt = self._accept_title(topic, title_data)
+        if not image_prompt:
             return False
         
-        # 生成图像提示词
-        image_prompt = self.build_image_prompt(title_data["主标题"], title_data["副标题"])
+        # 保存结果（不阻塞事件循环）
+        await self.asave_thread(topic, thread_text, title_data, image_prompt)
         
-        # 保存结果
-        self.save_thread(topic, thread_text, title_data, image_prompt)
+        self._logger.debug("话题「%s」处理完成", topic)
+        return True
+
+    def _accept_thread(self, topic: str, thread_text: Optional[str]) -> bool:
+        """检查生成的Thread，生成失败时返回 False"""
+        if not thread_text:
+            self.debug_log(f"话题「{topic}」Thread生成失败", "ERROR")
+            return False
         
-        self.debug_log(f"话题「{topic}」处理完成")
+        print(f"\n🧵 「{topic}」Thread 内容：\n", thread_text)
         return True
 
-    def process_all_topics(self, topics_file: str = "input/topics.txt"):
-        """处理所有话题"""
+    def _accept_title(self, topic: str, title_data: Optional[Dict[str, str]]) -> Optional[str]:
+        """检查提取的标题并生成图像提示词，标题无效时返回 None"""
+        if not isinstance(title_data, dict) or not _TITLE_KEYS <= title_data.keys():
+            self.debug_log(f"话题「{topic}」标题提取失败", "ERROR")
+            return None
+        
+        return self.build_image_prompt(title_data["主标题"], title_data["副标题"])
+
+    def process_all_topics(self, topics_file: str = "input/topics.txt",
+                           max_concurrency: int = MAX_CONCURRENT_TOPICS):
+        """
+        处理所有话题
+        
+        所有话题在同一个事件循环里并发处理，每个话题的两次 GPT 请求仍然先后进行，
+        总耗时接近最慢的话题而不是所有话题之和
+        
+        Args:
+            topics_file: 话题文件路径
+            max_concurrency: 同时处理的话题数上限
+        """
+        asyncio.run(self.process_all_topics_async(topics_file, max_concurrency))
+
+    async def process_all_topics_async(self, topics_file: str = "input/topics.txt",
+                                       max_concurrency: int = MAX_CONCURRENT_TOPICS):
+        """处理所有话题（异步版本），参数同 process_all_topics"""
         topics = self.read_topics(topics_file)
         if not topics:
             self.debug_log("没有话题需要处理", "ERROR")
             return
             
-        self.debug_log(f"准备处理 {len(topics)} 个话题")
-        success_count = 0
+        self._logger.debug("准备并发处理 %s 个话题（并发上限 %s）", len(topics), max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
         
-        for topic in topics:
-            if self.process_topic(topic):
-                success_count += 1
+        async def handle(topic: str) -> bool:
+            async with semaphore:
+                return await self.aprocess_topic(topic)
+        
+        outcomes = await asyncio.gather(*(handle(topic) for topic in topics))
+        success_count = sum(outcomes)
         
         print(f"\n🎉 处理完成: {success_count}/{len(topics)} 个话题成功")
-        self.debug_log(f"处理完成: {success_count}/{len(topics)} 个话题成功")
-        self.debug_log(f"总计API调用: {self.request_count} 次")
-
+        self._logger.debug("处理完成: %s/%s 个话题成功", success_count, len(topics))
+        self._logger.debug("总计API调用: %s 次", self.request_count)
 
 def main():
     """主函数"""
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查看本地草稿
+把 msgpack 格式的草稿（draft_*.msgpack）以 JSON 格式打印出来
+
+用法: python tools/read_draft.py output/draft_xxx.msgpack [更多文件...]
+"""
+
+import sys
+import json
+
+try:
+    import msgpack
+except ImportError:
+    print("❌ msgpack 未安装，请运行: pip install msgpack")
+    sys.exit(1)
+
+
+def read_draft(path: str) -> dict:
+    """读取 msgpack 草稿文件"""
+    with open(path, 'rb') as f:
+        return msgpack.unpackb(f.read(), raw=False)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(1)
+
+    for path in sys.argv[1:]:
+        try:
+            print(json.dumps(read_draft(path), ensure_ascii=False, indent=2))
+        except Exception as e:
+            print(f"❌ 读取草稿失败 {path}: {e}")
+
+
+if __name__ == '__main__':
+    main()